@@ -0,0 +1,3 @@
+"""
+Configuration de pytest : la racine du dépôt est ajoutée au chemin d'import (paquet modules).
+"""
@@ -8,6 +8,11 @@ import numpy as np
 import time
 import os
 import argparse
+import asyncio
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Importer les modules
@@ -33,7 +38,11 @@ class VehicleSpeedDetectionSystem:
             'reference_width_meters': 3.5,  # Largeur standard de la voie
             'output_dir': 'data',
             'save_interval': 10,  # Sauvegarder les données toutes les 10 secondes
-            'display_results': True
+            'display_results': True,
+            'prefetch_frames': 8,  # Taille des files du pipeline lecture / traitement / écriture
+            'process_every_n': 1,  # Traiter une image sur N (1 : toutes les images)
+            'camera_frames_in_flight': 4,  # Images de caméra en attente avant d'abandonner les plus anciennes
+            'backend': 'ffmpeg'  # Backend de capture : 'ffmpeg' (logiciel) ou 'gstreamer' (décodage NVDEC)
         }
         
         # Mettre à jour avec la configuration fournie
@@ -72,110 +81,236 @@ class VehicleSpeedDetectionSystem:
         self.frame_count = 0
         self.fps = 0
         self.last_save_time = time.time()
-        self.processing_times = []
+        self.processing_times = deque(maxlen=10)
+        self._processing_time_sum = 0.0
+        self._fps_clock = None  # (perf_counter, frame_count) de la dernière mesure du FPS
+        
+        # Dernier horodatage affiché, à la seconde près
+        self._last_ts_sec = -1
+        self._last_ts_str = ""
+        
+        # Calque pré-rendu du FPS et de l'horodatage (coin supérieur gauche), retracé seulement quand le texte change
+        self._overlay = np.zeros((100, 300, 3), np.uint8)
+        self._overlay_mask = np.zeros((100, 300, 1), np.bool_)
+        self._last_fps_str = None
+        
+        # Intervalle de sauvegarde en images (défini pendant le traitement d'un fichier vidéo)
+        self._save_every_frames = None
+        
+        # État de la dernière image traitée, réutilisé par les images sautées
+        self._last_bounding_boxes = None
+        self._last_detection_line_y = None
+        self._last_tracked_vehicles = None
+        self._last_vehicle_arrays = None  # (IDs, boîtes englobantes) des véhicules suivis
+        
+        # Choisir une fois pour toutes le traitement des images selon le mode d'affichage
+        if self.config['display_results']:
+            self.process_frame = self._process_frame_display
+        else:
+            self.process_frame = self._process_frame_headless
     
-    def process_frame(self, frame, frame_time=None):
+    def _analyze_frame(self, frame, frame_time, draw, detection=None):
         """
-        Traiter une seule image de la vidéo.
+        Détecter, suivre et mesurer les véhicules d'une image, sans produire de visualisation.
         
         Args:
             frame: Image d'entrée de la vidéo
             frame_time: Horodatage de l'image (si None, utilise l'heure actuelle)
+            draw: Si True, le détecteur dessine ses détections sur une copie de l'image
+            detection: Résultat de detect_vehicles déjà calculé pour cette image (si None, détecte ici)
             
         Retourne:
-            Image traitée avec des visualisations
+            Tuple (détection exécutée sur cette image, image de détection ou None, véhicules suivis, horodatage)
         """
         if frame_time is None:
             frame_time = time.time()
         
-        start_time = time.time()
-        
-        # Étape 1 : Détecter les véhicules
-        bounding_boxes, detection_frame, detection_line_y = self.detector.detect_vehicles(frame)
-        
-        # Étape 2 : Suivre les véhicules
-        tracked_vehicles = self.tracker.update(bounding_boxes, detection_line_y)
-        
-        # Étape 3 : Calculer les vitesses (si le calculateur de distance est calibré)
-        if self.distance_calculator.pixels_per_meter is None:
-            # Calibrer le calculateur de distance si ce n'est pas déjà fait
-            self.distance_calculator.calibrate_from_lane_width(
-                frame, 
-                lane_width_meters=self.config['reference_width_meters']
+        # Ne lancer la détection, le suivi et le calcul des vitesses qu'une image sur N (ou si la
+        # détection a déjà été faite) ; les images intermédiaires réutilisent l'état de la dernière image traitée
+        process_every_n = self.config['process_every_n']
+        process_now = (detection is not None or self.frame_count % process_every_n == 0
+                       or self._last_tracked_vehicles is None)
+        
+        if process_now:
+            # Étape 1 : Détecter les véhicules (sauf si la détection a été faite à l'avance)
+            if detection is None:
+                detection = self.detector.detect_vehicles(frame, draw=draw)
+            bounding_boxes, detection_frame, detection_line_y = detection
+            
+            # Étape 2 : Suivre les véhicules (et récupérer leur état sous forme de tableaux, dans le même ordre)
+            tracked_vehicles = self.tracker.step(bounding_boxes, detection_line_y)
+            vehicle_ids, bboxes, crossed_line = self.tracker.get_vehicle_arrays()
+            
+            # Étape 3 : Calculer les vitesses (si le calculateur de distance est calibré)
+            if self.distance_calculator.pixels_per_meter is None:
+                # Calibrer le calculateur de distance si ce n'est pas déjà fait
+                self.distance_calculator.calibrate_from_lane_width(
+                    frame, 
+                    lane_width_meters=self.config['reference_width_meters']
+                )
+            
+            self.speed_calculator.update(
+                tracked_vehicles, 
+                frame_number=self.frame_count,
+                current_time=frame_time,
+                bboxes=bboxes
             )
-        
-        speeds = self.speed_calculator.update(
-            tracked_vehicles, 
-            frame_number=self.frame_count,
-            current_time=frame_time
-        )
-        
-        # Étape 4 : Mettre à jour le compteur de véhicules
-        vehicle_count = self.counter.update(
-            tracked_vehicles, 
-            frame.shape,
-            current_time=frame_time
-        )
-        
-        # Étape 5 : Stocker les données
-        for vehicle_id, vehicle_data in tracked_vehicles.items():
-            bbox = vehicle_data['bbox']
-            speed = speeds.get(vehicle_id, None)
-            crossed_line = vehicle_data.get('crossed_line', False)
             
-            self.data_storage.add_vehicle_record(
-                vehicle_id=vehicle_id,
+            # Étape 4 : Mettre à jour le compteur de véhicules
+            vehicle_count = self.counter.update(
+                vehicle_ids,
+                crossed_line,
+                current_time=frame_time
+            )
+            
+            # Étape 5 : Stocker les données de tous les véhicules de l'image en une fois
+            # (vitesses dans l'ordre des véhicules du suiveur, -1 pour ceux sans vitesse calculée)
+            avg_speeds, has_speed = self.speed_calculator.get_speed_arrays()
+            vehicle_speeds = np.where(has_speed, avg_speeds, -1.0)
+            
+            self.data_storage.add_vehicle_records(
+                vehicle_ids=vehicle_ids,
                 timestamp=frame_time,
-                bbox=bbox,
-                speed=speed,
+                bboxes=bboxes,
+                speeds=vehicle_speeds,
                 crossed_line=crossed_line
             )
+            
+            # Conserver l'état pour les images sautées
+            self._last_bounding_boxes = bounding_boxes
+            self._last_detection_line_y = detection_line_y
+            self._last_tracked_vehicles = tracked_vehicles
+            self._last_vehicle_arrays = (vehicle_ids, bboxes)
+        else:
+            detection_frame = None
+            tracked_vehicles = self._last_tracked_vehicles
         
         # Sauvegarder les données périodiquement
-        if time.time() - self.last_save_time > self.config['save_interval']:
+        if self._save_every_frames is not None:
+            # Fichier vidéo : planifier d'après le numéro d'image, sans interroger l'horloge
+            if self.frame_count > 0 and self.frame_count % self._save_every_frames == 0:
+                self.save_data()
+        elif time.time() - self.last_save_time > self.config['save_interval']:
             self.save_data()
             self.last_save_time = time.time()
         
-        # Calculer le temps de traitement et le FPS
-        processing_time = time.time() - start_time
-        self.processing_times.append(processing_time)
-        
-        # Calculer le FPS moyen sur les 10 derniers frames
-        if len(self.processing_times) > 10:
-            self.processing_times.pop(0)
+        # Mesurer le FPS une image sur 10 d'après le temps réel écoulé entre les images consommées :
+        # la détection faite dans le thread de lecture, l'affichage et l'écriture sont ainsi comptés
+        if self.frame_count % 10 == 0:
+            now = time.perf_counter()
+            if self._fps_clock is not None and self.frame_count > self._fps_clock[1]:
+                last_clock, last_frame_count = self._fps_clock
+                processing_time = (now - last_clock) / (self.frame_count - last_frame_count)
+                
+                # Calculer le FPS moyen sur les 10 dernières mesures (somme glissante)
+                if len(self.processing_times) == self.processing_times.maxlen:
+                    self._processing_time_sum -= self.processing_times[0]
+                self.processing_times.append(processing_time)
+                self._processing_time_sum += processing_time
+                
+                avg_processing_time = self._processing_time_sum / len(self.processing_times)
+                self.fps = 1.0 / avg_processing_time if avg_processing_time > 0 else 0
+            self._fps_clock = (now, self.frame_count)
         
-        avg_processing_time = sum(self.processing_times) / len(self.processing_times)
-        self.fps = 1.0 / avg_processing_time if avg_processing_time > 0 else 0
+        return process_now, detection_frame, tracked_vehicles, frame_time
+    
+    def _process_frame_display(self, frame, frame_time=None, detection=None):
+        """
+        Traiter une seule image de la vidéo et dessiner les visualisations.
         
-        # Créer l'image résultat avec les visualisations
-        if self.config['display_results']:
-            # Dessiner les informations de suivi
-            result_frame = detection_frame.copy()
-            
-            # Dessiner les vitesses
-            result_frame = self.speed_calculator.draw_speeds(result_frame, tracked_vehicles)
-            
-            # Dessiner le compteur
-            result_frame = self.counter.draw_counter(result_frame)
-            
-            # Dessiner la ligne de référence pour la distance
-            result_frame = self.distance_calculator.draw_reference_line(result_frame)
-            
-            # Dessiner le FPS
-            cv2.putText(result_frame, f"FPS: {self.fps:.1f}", (10, 60), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        Args:
+            frame: Image d'entrée de la vidéo
+            frame_time: Horodatage de l'image (si None, utilise l'heure actuelle)
+            detection: Résultat de detect_vehicles déjà calculé pour cette image (optionnel)
             
-            # Dessiner l'horodatage
-            timestamp_str = datetime.fromtimestamp(frame_time).strftime("%M:%S")
-            cv2.putText(result_frame, timestamp_str, (10, 90), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        Retourne:
+            Image traitée avec des visualisations (l'image d'entrée, annotée en place)
+        """
+        process_now, detection_frame, tracked_vehicles, frame_time = self._analyze_frame(
+            frame, frame_time, draw=True, detection=detection
+        )
+        
+        # Dessiner les informations de suivi directement sur l'image : chaque image lue est
+        # propre au pipeline et l'image d'origine n'est jamais affichée, aucune copie n'est donc faite
+        if process_now:
+            result_frame = detection_frame
         else:
-            result_frame = frame
+            # Redessiner les dernières détections sur l'image courante
+            result_frame = self.detector.draw_detections(
+                frame, self._last_bounding_boxes, self._last_detection_line_y
+            )
+        
+        # Dessiner les vitesses
+        result_frame = self.speed_calculator.draw_speeds(result_frame, *self._last_vehicle_arrays)
+        
+        # Dessiner le compteur
+        result_frame = self.counter.draw_counter(result_frame)
+        
+        # Dessiner la ligne de référence pour la distance
+        result_frame = self.distance_calculator.draw_reference_line(result_frame)
+        
+        # Dessiner le FPS et l'horodatage (reformaté seulement quand la seconde change)
+        fps_str = f"FPS: {self.fps:.1f}"
+        timestamp_sec = int(frame_time)
+        if timestamp_sec != self._last_ts_sec:
+            self._last_ts_str = datetime.fromtimestamp(timestamp_sec).strftime("%M:%S")
+            self._last_ts_sec = timestamp_sec
+            self._last_fps_str = None
+        if fps_str != self._last_fps_str:
+            self._render_overlay(fps_str)
+        
+        # Copier le calque pré-rendu sur l'image (seulement les pixels du texte)
+        frame_height, frame_width = result_frame.shape[:2]
+        overlay_height, overlay_width = self._overlay.shape[:2]
+        height = min(frame_height, overlay_height)
+        width = min(frame_width, overlay_width)
+        np.copyto(
+            result_frame[:height, :width],
+            self._overlay[:height, :width],
+            where=self._overlay_mask[:height, :width]
+        )
         
         self.frame_count += 1
         
         return result_frame
     
+    def _render_overlay(self, fps_str):
+        """
+        Retracer le calque du FPS et de l'horodatage et son masque.
+        
+        Args:
+            fps_str: Texte du FPS à afficher
+        """
+        self._overlay.fill(0)
+        mask = np.zeros(self._overlay.shape[:2], np.uint8)
+        
+        for text, origin in ((fps_str, (10, 60)), (self._last_ts_str, (10, 90))):
+            cv2.putText(self._overlay, text, origin, 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(mask, text, origin, 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, 255, 2)
+        
+        self._overlay_mask[..., 0] = mask > 0
+        self._last_fps_str = fps_str
+    
+    def _process_frame_headless(self, frame, frame_time=None, detection=None):
+        """
+        Traiter une seule image de la vidéo sans visualisation (aucune copie ni dessin).
+        
+        Args:
+            frame: Image d'entrée de la vidéo
+            frame_time: Horodatage de l'image (si None, utilise l'heure actuelle)
+            detection: Résultat de detect_vehicles déjà calculé pour cette image (optionnel)
+            
+        Retourne:
+            Image d'entrée, non modifiée
+        """
+        self._analyze_frame(frame, frame_time, draw=False, detection=detection)
+        
+        self.frame_count += 1
+        
+        return frame
+    
     def save_data(self):
         """
         Sauvegarder toutes les données collectées dans des fichiers.
@@ -205,6 +340,309 @@ class VehicleSpeedDetectionSystem:
         
         return saved_files
     
+    def _open_capture(self, source):
+        """
+        Ouvrir une capture vidéo avec le backend configuré.
+        
+        Avec le backend 'gstreamer', un fichier est décodé par NVDEC (nvh264dec) et une caméra
+        est lue par v4l2src. Si le pipeline ne peut pas être ouvert (OpenCV compilé sans
+        GStreamer, pas de GPU NVIDIA, conteneur non MP4...), la capture par défaut est utilisée.
+        
+        Args:
+            source: Chemin du fichier vidéo ou ID de la caméra
+            
+        Retourne:
+            Capture vidéo (cv2.VideoCapture)
+        """
+        if self.config['backend'] == 'gstreamer':
+            if isinstance(source, int):
+                pipeline = (f"v4l2src device=/dev/video{source} ! videoconvert ! "
+                            "video/x-raw,format=BGR ! appsink")
+            else:
+                # Entourer le chemin de guillemets (en échappant ceux qu'il contient) pour les noms avec espaces
+                location = str(source).replace('\\', '\\\\').replace('"', '\\"')
+                pipeline = (f'filesrc location="{location}" ! qtdemux ! h264parse ! nvh264dec ! '
+                            "videoconvert ! video/x-raw,format=BGR ! appsink sync=false")
+            
+            cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                return cap
+            
+            cap.release()
+            
+            # Indiquer la cause du repli sur le backend par défaut
+            if self._opencv_has_gstreamer():
+                reason = f"le pipeline n'a pas pu être ouvert ({pipeline})"
+            else:
+                reason = "OpenCV est compilé sans GStreamer"
+            print(f"Avertissement : pipeline GStreamer indisponible, {reason} ; utilisation du backend par défaut")
+        
+        return cv2.VideoCapture(source)
+    
+    @staticmethod
+    def _opencv_has_gstreamer():
+        """
+        Vérifier si OpenCV est compilé avec la prise en charge de GStreamer.
+        
+        Retourne:
+            True si le backend GStreamer est disponible
+        """
+        for line in cv2.getBuildInformation().splitlines():
+            if line.strip().startswith('GStreamer:'):
+                return 'YES' in line
+        return False
+    
+    def _read_frames(self, cap, read_q, stop_event, first_frame_number=0):
+        """
+        Lire les images de la capture et détecter les véhicules dans un thread dédié.
+        
+        La détection (soustraction de fond, qui libère le GIL) est faite ici pour les
+        images qui seront traitées, pendant que le thread principal suit, mesure et
+        dessine les images précédentes.
+        
+        Args:
+            cap: Capture vidéo ouverte (cv2.VideoCapture)
+            read_q: File bornée recevant les tuples (index, image, détection ou None), puis None en fin de flux
+                    (précédé de ('error', exception) si la lecture ou la détection échoue)
+            stop_event: Événement signalant un arrêt anticipé du pipeline
+            first_frame_number: Numéro d'image (frame_count) de la première image lue
+        """
+        draw = self.config['display_results']
+        process_every_n = self.config['process_every_n']
+        
+        idx = 0
+        try:
+            while not stop_event.is_set():
+                ret, frame = cap.read()
+                
+                if not ret:
+                    break
+                
+                # Ne détecter que les images qui seront traitées (toujours la première du flux)
+                if idx == 0 or (first_frame_number + idx) % process_every_n == 0:
+                    detection = self.detector.detect_vehicles(frame, draw=draw)
+                else:
+                    detection = None
+                
+                read_q.put((idx, frame, detection))
+                idx += 1
+        except BaseException as exc:
+            # Transmettre l'erreur au thread principal, qui la relance au lieu de finir le flux normalement
+            read_q.put(('error', exc))
+        finally:
+            # Sentinelle de fin de flux
+            read_q.put(None)
+    
+    def _write_frames(self, out, write_q, errors):
+        """
+        Écrire les images traitées dans la vidéo de sortie dans un thread dédié.
+        
+        Args:
+            out: Écrivain vidéo ouvert (cv2.VideoWriter)
+            write_q: File bornée des images à écrire, terminée par None
+            errors: Liste recevant l'exception qui a arrêté l'écriture (relancée par le thread principal)
+        """
+        try:
+            while True:
+                frame = write_q.get()
+                
+                if frame is None:
+                    break
+                
+                out.write(frame)
+        except BaseException as exc:
+            errors.append(exc)
+    
+    def _put_frame(self, write_q, writer, frame):
+        """
+        Envoyer une image au thread d'écriture sans bloquer indéfiniment s'il s'est arrêté.
+        
+        Args:
+            write_q: File bornée des images à écrire
+            writer: Thread d'écriture
+            frame: Image à écrire (ou None pour terminer l'écriture)
+            
+        Retourne:
+            True si l'image a été envoyée, False si le thread d'écriture est arrêté
+        """
+        while writer.is_alive():
+            try:
+                write_q.put(frame, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def _run_pipeline(self, cap, out, fps):
+        """
+        Traiter une vidéo ouverte avec un pipeline à trois étages.
+        
+        La lecture et la détection (cap.read, detect_vehicles) et l'écriture (out.write)
+        s'exécutent dans des threads dédiés reliés au thread principal par des files
+        bornées, ce qui recouvre le décodage, la soustraction de fond et l'encodage avec
+        le suivi et le dessin (OpenCV libère le GIL). L'affichage reste sur le thread
+        principal car HighGUI n'est pas thread-safe.
+        
+        Args:
+            cap: Capture vidéo ouverte (cv2.VideoCapture)
+            out: Écrivain vidéo (si None, n'écrit pas de vidéo de sortie)
+            fps: FPS de la vidéo pour dériver les horodatages
+        """
+        # Repartir d'une nouvelle mesure du FPS (sans compter le temps écoulé avant ce flux)
+        self._fps_clock = None
+        
+        prefetch = self.config['prefetch_frames']
+        read_q = queue.Queue(maxsize=prefetch)
+        write_q = queue.Queue(maxsize=prefetch)
+        stop_event = threading.Event()
+        
+        reader = threading.Thread(
+            target=self._read_frames, args=(cap, read_q, stop_event, self.frame_count), daemon=True
+        )
+        reader.start()
+        
+        writer = None
+        writer_errors = []
+        if out is not None:
+            writer = threading.Thread(target=self._write_frames, args=(out, write_q, writer_errors), daemon=True)
+            writer.start()
+        
+        try:
+            while True:
+                item = read_q.get()
+                
+                if item is None:
+                    break
+                
+                # Relancer l'erreur de lecture ou de détection du thread de lecture
+                if item[0] == 'error':
+                    raise item[1]
+                
+                _, frame, detection = item
+                
+                # Obtenir l'horodatage de l'image
+                frame_time = self.frame_count / fps if fps > 0 else time.time()
+                
+                # Traiter l'image
+                result_frame = self.process_frame(frame, frame_time, detection=detection)
+                
+                # Envoyer l'image au thread d'écriture (et relancer son erreur s'il s'est arrêté)
+                if writer is not None and not self._put_frame(write_q, writer, result_frame):
+                    raise writer_errors[0]
+                
+                # Afficher l'image
+                if self.config['display_results']:
+                    cv2.imshow('Détection de Vitesse des Véhicules', result_frame)
+                    
+                    # Sortir si 'q' est pressé
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+        finally:
+            # Arrêter le lecteur et vider sa file pour le débloquer
+            stop_event.set()
+            while reader.is_alive():
+                try:
+                    read_q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            reader.join()
+            
+            # Terminer l'écriture des images en attente (sans bloquer si le thread d'écriture est arrêté)
+            if writer is not None:
+                self._put_frame(write_q, writer, None)
+                writer.join()
+        
+        # Relancer une erreur d'écriture survenue sur les dernières images
+        if writer_errors:
+            raise writer_errors[0]
+    
+    async def _run_camera_pipeline(self, cap, out, duration=None):
+        """
+        Traiter un flux de caméra avec plusieurs images en vol.
+        
+        Un thread de capture lit les images (cap.read) et les dépose, horodatées à la
+        capture, dans une file asyncio bornée. Le traitement s'exécute dans un second
+        thread pendant que la capture suivante est en cours, et l'affichage reste sur
+        la boucle d'événements (thread principal). Quand la file est pleine, l'image la
+        plus ancienne est abandonnée pour borner la latence.
+        
+        Args:
+            cap: Capture de la caméra ouverte (cv2.VideoCapture)
+            out: Écrivain vidéo (si None, n'écrit pas de vidéo de sortie)
+            duration: Durée d'enregistrement en secondes (si None, s'arrête quand 'q' est pressé)
+        """
+        # Repartir d'une nouvelle mesure du FPS (sans compter le temps écoulé avant ce flux)
+        self._fps_clock = None
+        
+        loop = asyncio.get_running_loop()
+        capture_q = asyncio.Queue(maxsize=self.config['camera_frames_in_flight'])
+        stop_event = asyncio.Event()
+        
+        capture_executor = ThreadPoolExecutor(max_workers=1)
+        process_executor = ThreadPoolExecutor(max_workers=1)
+        write_executor = ThreadPoolExecutor(max_workers=1)
+        
+        def put_newest(item):
+            # La plus récente l'emporte : abandonner l'image la plus ancienne si la file est pleine
+            if capture_q.full():
+                capture_q.get_nowait()
+            capture_q.put_nowait(item)
+        
+        async def produce():
+            try:
+                while not stop_event.is_set():
+                    ret, frame = await loop.run_in_executor(capture_executor, cap.read)
+                    
+                    if not ret:
+                        break
+                    
+                    put_newest((time.time(), frame))
+            finally:
+                # Sentinelle de fin de flux
+                put_newest(None)
+        
+        producer = loop.create_task(produce())
+        
+        # Définir l'heure de début pour le suivi de la durée
+        start_time = time.time()
+        
+        try:
+            while True:
+                item = await capture_q.get()
+                
+                if item is None:
+                    break
+                
+                frame_time, frame = item
+                
+                # Traiter l'image pendant que la capture suivante se poursuit
+                result_frame = await loop.run_in_executor(
+                    process_executor, self.process_frame, frame, frame_time
+                )
+                
+                # Écrire l'image dans la vidéo de sortie (un seul thread, l'ordre est conservé)
+                if out is not None:
+                    write_executor.submit(out.write, result_frame)
+                
+                # Afficher l'image
+                if self.config['display_results']:
+                    cv2.imshow('Détection de Vitesse des Véhicules', result_frame)
+                    
+                    # Sortir si 'q' est pressé
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+                
+                # Vérifier si la durée est écoulée
+                if duration is not None and time.time() - start_time > duration:
+                    break
+        finally:
+            # Arrêter la capture et attendre la fin des écritures en attente
+            stop_event.set()
+            await producer
+            capture_executor.shutdown()
+            process_executor.shutdown()
+            write_executor.shutdown(wait=True)
+    
     def process_video(self, video_path, output_path=None):
         """
         Traiter un fichier vidéo.
@@ -217,7 +655,7 @@ class VehicleSpeedDetectionSystem:
             Dictionnaire des chemins des fichiers de données sauvegardés
         """
         # Ouvrir le fichier vidéo
-        cap = cv2.VideoCapture(video_path)
+        cap = self._open_capture(video_path)
         
         # Vérifier si la vidéo est bien ouverte
         if not cap.isOpened():
@@ -236,42 +674,30 @@ class VehicleSpeedDetectionSystem:
         if output_path is not None:
             fourcc = cv2.VideoWriter_fourcc(*'XVID')
             out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        else:
+            out = None
         
-        # Traiter les images de la vidéo
-        while cap.isOpened():
-            ret, frame = cap.read()
-            
-            if not ret:
-                break
-            
-            # Obtenir l'horodatage de l'image
-            frame_time = self.frame_count / fps if fps > 0 else time.time()
-            
-            # Traiter l'image
-            result_frame = self.process_frame(frame, frame_time)
-            
-            # Écrire l'image dans la vidéo de sortie
-            if output_path is not None:
-                out.write(result_frame)
-            
-            # Afficher l'image
-            if self.config['display_results']:
-                cv2.imshow('Détection de Vitesse des Véhicules', result_frame)
-                
-                # Sortir si 'q' est pressé
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+        # Sauvegarder d'après le nombre d'images traitées plutôt que l'horloge murale
+        if fps > 0:
+            self._save_every_frames = max(1, int(self.config['save_interval'] * fps))
+        
+        # Traiter les images de la vidéo à travers le pipeline lecture / traitement / écriture
+        try:
+            self._run_pipeline(cap, out, fps=fps)
+        finally:
+            self._save_every_frames = None
         
         # Libérer les ressources
         cap.release()
         
-        if output_path is not None:
+        if out is not None:
             out.release()
         
         cv2.destroyAllWindows()
         
         # Sauvegarder les données finales
         saved_files = self.save_data()
+        self.data_storage.close()
         
         return saved_files
     
@@ -315,7 +741,7 @@ class VehicleSpeedDetectionSystem:
             Dictionnaire des chemins des fichiers de données sauvegardés
         """
         # Ouvrir la caméra
-        cap = cv2.VideoCapture(camera_id)
+        cap = self._open_capture(camera_id)
         
         # Vérifier si la caméra est bien ouverte
         if not cap.isOpened():
@@ -327,53 +753,36 @@ class VehicleSpeedDetectionSystem:
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         fps = cap.get(cv2.CAP_PROP_FPS)
         
-        # Définir le FPS pour le calculateur de vitesse
-        self.speed_calculator.set_fps(fps)
+        # Calculer les vitesses d'après l'horodatage de capture de chaque image, et non d'après
+        # le numéro d'image et le FPS : les images abandonnées quand la file est pleine ne sont
+        # pas comptées et fausseraient le temps écoulé
+        self.speed_calculator.set_fps(None)
         
         # Créer un écrivain vidéo si un chemin de sortie est fourni
         if output_path is not None:
             fourcc = cv2.VideoWriter_fourcc(*'XVID')
             out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        else:
+            out = None
         
-        # Définir l'heure de début pour le suivi de la durée
-        start_time = time.time()
-        
-        # Traiter les images de la caméra
-        while cap.isOpened():
-            ret, frame = cap.read()
-            
-            if not ret:
-                break
-            
-            # Traiter l'image
-            result_frame = self.process_frame(frame)
-            
-            # Écrire l'image dans la vidéo de sortie
-            if output_path is not None:
-                out.write(result_frame)
-            
-            # Afficher l'image
-            if self.config['display_results']:
-                cv2.imshow('Détection de Vitesse des Véhicules', result_frame)
-                
-                # Sortir si 'q' est pressé
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-            
-            # Vérifier si la durée est écoulée
-            if duration is not None and time.time() - start_time > duration:
-                break
+        # Traiter les images de la caméra avec un pipeline asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._run_camera_pipeline(cap, out, duration))
+        finally:
+            loop.close()
         
         # Libérer les ressources
         cap.release()
         
-        if output_path is not None:
+        if out is not None:
             out.release()
         
         cv2.destroyAllWindows()
         
         # Sauvegarder les données finales
         saved_files = self.save_data()
+        self.data_storage.close()
         
         return saved_files
 
@@ -398,6 +807,10 @@ def main():
                         help='Surface minimale du véhicule en pixels (par défaut : 500)')
     parser.add_argument('--output-dir', type=str, default='data', 
                         help='Répertoire de sortie pour les fichiers de données (par défaut : data)')
+    parser.add_argument('--backend', type=str, default='ffmpeg', choices=['ffmpeg', 'gstreamer'],
+                        help='Backend de capture vidéo (par défaut : ffmpeg)')
+    parser.add_argument('--process-every-n', type=int, default=1,
+                        help='Traiter une image sur N, les autres réutilisent le dernier suivi (par défaut : 1)')
     
     args = parser.parse_args()
     
@@ -407,7 +820,9 @@ def main():
         'detection_line_position': args.detection_line,
         'reference_width_meters': args.lane_width,
         'output_dir': args.output_dir,
-        'display_results': args.display
+        'display_results': args.display,
+        'process_every_n': max(1, args.process_every_n),
+        'backend': args.backend
     }
     
     # Créer le système de détection de vitesse des véhicules
@@ -5,12 +5,72 @@ Ce module gère la sauvegarde des données dans des fichiers CSV et d'autres for
 
 import os
 import csv
-import json
-import pandas as pd
 import datetime
 import numpy as np
+import orjson
+from numba import njit
+
+
+@njit('Tuple((int64[::1], int64))(float64[::1], int64[::1], float64[::1], int64)', cache=True)
+def _last_speed_histogram(ts, vid, speed, bin_width):
+    """
+    Calculer l'histogramme de la dernière vitesse valide de chaque véhicule en un seul parcours.
+    
+    Args:
+        ts: Horodatages des enregistrements
+        vid: IDs des véhicules des enregistrements (entiers positifs)
+        speed: Vitesses en km/h des enregistrements (négatives si non disponibles)
+        bin_width: Largeur des bacs de vitesse en km/h
+        
+    Retourne:
+        Tuple (nombre de véhicules par bac, nombre de véhicules ayant une vitesse valide)
+    """
+    n = ts.shape[0]
+    
+    max_id = -1
+    for i in range(n):
+        if vid[i] > max_id:
+            max_id = vid[i]
+    
+    # Dernière vitesse valide par véhicule (les IDs du suiveur sont des petits entiers denses)
+    last_ts = np.full(max_id + 1, -np.inf)
+    last_speed = np.full(max_id + 1, -1.0)
+    for i in range(n):
+        if speed[i] >= 0 and ts[i] >= last_ts[vid[i]]:
+            last_ts[vid[i]] = ts[i]
+            last_speed[vid[i]] = speed[i]
+    
+    num_vehicles = 0
+    max_speed = 0.0
+    for v in range(max_id + 1):
+        if last_speed[v] >= 0:
+            num_vehicles += 1
+            if last_speed[v] > max_speed:
+                max_speed = last_speed[v]
+    
+    if num_vehicles == 0:
+        return np.zeros(0, np.int64), 0
+    
+    # Mêmes bacs que range(0, ceil(max_speed) + bin_width, bin_width)
+    num_bins = max(1, (int(np.ceil(max_speed)) + bin_width - 1) // bin_width)
+    counts = np.zeros(num_bins, np.int64)
+    for v in range(max_id + 1):
+        if last_speed[v] >= 0:
+            b = int(last_speed[v] // bin_width)
+            if b >= num_bins:
+                b = num_bins - 1
+            counts[b] += 1
+    
+    return counts, num_vehicles
+
 
 class DataStorage:
+    # Nombre d'enregistrements préalloués
+    INITIAL_CAPACITY = 4096
+    
+    # Format de l'identifiant de session (aussi utilisé dans les noms de fichiers)
+    SESSION_ID_FORMAT = "%Y %m %d_%H %M %S"
+    
     def __init__(self, output_dir='data'):
         """
         Initialiser le module de stockage des données.
@@ -19,13 +79,89 @@ class DataStorage:
             output_dir: Répertoire pour sauvegarder les fichiers de données
         """
         self.output_dir = output_dir
-        self.vehicle_data = []  # Liste pour stocker les enregistrements des véhicules
         self.session_start_time = datetime.datetime.now()
-        self.session_id = self.session_start_time.strftime("%Y %m %d_%H %M %S")
+        self.session_id = self.session_start_time.strftime(self.SESSION_ID_FORMAT)
+        
+        # Stockage en colonnes (structure de tableaux) des enregistrements des véhicules
+        self._allocate(self.INITIAL_CAPACITY)
+        
+        # Flux CSV ouvert par save_to_csv et nombre d'enregistrements déjà écrits
+        self._csv_file = None
+        self._csv_writer = None
+        self._csv_path = None
+        self._csv_flushed = 0
         
         # Créer le répertoire de sortie s'il n'existe pas
         os.makedirs(output_dir, exist_ok=True)
     
+    def _allocate(self, capacity):
+        """
+        Allouer des colonnes vides pour les enregistrements des véhicules.
+        
+        Args:
+            capacity: Nombre d'enregistrements pouvant être stockés avant agrandissement
+        """
+        self._cap = capacity
+        self._n = 0
+        self._ts = np.empty(capacity, np.float64)
+        self._vid = np.empty(capacity, np.int64)
+        self._x = np.empty(capacity, np.int32)
+        self._y = np.empty(capacity, np.int32)
+        self._w = np.empty(capacity, np.int32)
+        self._h = np.empty(capacity, np.int32)
+        self._speed = np.empty(capacity, np.float64)
+        self._crossed = np.empty(capacity, np.int8)
+    
+    def _reserve(self, count):
+        """
+        Garantir la place pour `count` enregistrements supplémentaires.
+        La capacité est doublée autant que nécessaire.
+        
+        Args:
+            count: Nombre d'enregistrements à ajouter
+        """
+        required = self._n + count
+        if required <= self._cap:
+            return
+        
+        capacity = self._cap
+        while capacity < required:
+            capacity *= 2
+        
+        for name in ('_ts', '_vid', '_x', '_y', '_w', '_h', '_speed', '_crossed'):
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+        self._cap = capacity
+    
+    def _columns(self):
+        """
+        Obtenir les colonnes remplies des enregistrements des véhicules.
+        
+        Retourne:
+            Dictionnaire ordonné {nom de colonne: tableau NumPy}
+        """
+        n = self._n
+        return {
+            'timestamp': self._ts[:n],
+            'vehicle_id': self._vid[:n],
+            'x': self._x[:n],
+            'y': self._y[:n],
+            'width': self._w[:n],
+            'height': self._h[:n],
+            'speed': self._speed[:n],
+            'crossed_line': self._crossed[:n]
+        }
+    
+    @property
+    def vehicle_data(self):
+        """
+        Liste des enregistrements des véhicules sous forme de dictionnaires.
+        La session n'est pas répétée dans chaque enregistrement (voir session_id).
+        """
+        columns = self._columns()
+        names = list(columns)
+        rows = zip(*(column.tolist() for column in columns.values()))
+        return [dict(zip(names, row)) for row in rows]
+    
     def add_vehicle_record(self, vehicle_id, timestamp, bbox, speed=None, crossed_line=False):
         """
         Ajouter un enregistrement de détection de véhicule.
@@ -39,24 +175,65 @@ class DataStorage:
         """
         x, y, w, h = bbox
         
-        record = {
-            'session_id': self.session_id,
-            'timestamp': timestamp,
-            'vehicle_id': vehicle_id,
-            'x': x,
-            'y': y,
-            'width': w,
-            'height': h,
-            'speed': speed if speed is not None else -1,  # -1 indique que la vitesse n'est pas disponible
-            'crossed_line': 1 if crossed_line else 0
-        }
+        if isinstance(timestamp, datetime.datetime):
+            timestamp = timestamp.timestamp()
+        
+        self._reserve(1)
+        n = self._n
+        
+        self._ts[n] = timestamp
+        self._vid[n] = vehicle_id
+        self._x[n] = x
+        self._y[n] = y
+        self._w[n] = w
+        self._h[n] = h
+        self._speed[n] = speed if speed is not None else -1  # -1 indique que la vitesse n'est pas disponible
+        self._crossed[n] = 1 if crossed_line else 0
         
-        self.vehicle_data.append(record)
+        self._n = n + 1
+    
+    def add_vehicle_records(self, vehicle_ids, timestamp, bboxes, speeds=None, crossed_line=None):
+        """
+        Ajouter en une fois les enregistrements de tous les véhicules d'une image.
+        
+        Args:
+            vehicle_ids: Tableau des IDs des véhicules (N,)
+            timestamp: Horodatage de la détection (commun à la ligne ou tableau (N,))
+            bboxes: Tableau des boîtes englobantes (N, 4) au format (x, y, w, h)
+            speeds: Tableau des vitesses en km/h (N,), -1 si non disponible (si None, aucune vitesse)
+            crossed_line: Tableau booléen (N,) des véhicules ayant franchi la ligne (si None, aucun)
+        """
+        vehicle_ids = np.asarray(vehicle_ids)
+        count = len(vehicle_ids)
+        if count == 0:
+            return
+        
+        bboxes = np.asarray(bboxes).reshape(count, 4)
+        
+        self._reserve(count)
+        start = self._n
+        end = start + count
+        
+        self._ts[start:end] = timestamp
+        self._vid[start:end] = vehicle_ids
+        self._x[start:end] = bboxes[:, 0]
+        self._y[start:end] = bboxes[:, 1]
+        self._w[start:end] = bboxes[:, 2]
+        self._h[start:end] = bboxes[:, 3]
+        self._speed[start:end] = -1 if speeds is None else speeds
+        self._crossed[start:end] = 0 if crossed_line is None else crossed_line
+        
+        self._n = end
     
     def save_to_csv(self, filename=None):
         """
         Sauvegarder les données des véhicules dans un fichier CSV.
         
+        Le fichier reste ouvert d'un appel à l'autre : seuls les enregistrements ajoutés
+        depuis la dernière sauvegarde y sont écrits, puis le tampon est vidé sur disque.
+        L'identifiant de session est écrit une seule fois, en commentaire avant l'en-tête
+        (`# session_id,<id>`), et non dans chaque ligne.
+        
         Args:
             filename: Nom du fichier CSV (si None, génère un nom par défaut)
             
@@ -68,14 +245,39 @@ class DataStorage:
         
         filepath = os.path.join(self.output_dir, filename)
         
-        # Convertir en DataFrame pour une manipulation plus facile
-        df = pd.DataFrame(self.vehicle_data)
+        # Ouvrir un nouveau flux au premier appel ou si le fichier de destination change
+        if self._csv_file is None or self._csv_path != filepath:
+            self.close()
+            self._csv_file = open(filepath, 'w', newline='', buffering=1 << 20)
+            self._csv_writer = csv.writer(self._csv_file)
+            self._csv_writer.writerow(['# session_id', self.session_id])
+            self._csv_writer.writerow(list(self._columns()))
+            self._csv_path = filepath
+            self._csv_flushed = 0
         
-        # Sauvegarder dans un fichier CSV
-        df.to_csv(filepath, index=False)
+        # Écrire uniquement les enregistrements ajoutés depuis la dernière sauvegarde
+        start, end = self._csv_flushed, self._n
+        if end > start:
+            columns = [column[start:end].tolist() for column in self._columns().values()]
+            self._csv_writer.writerows(zip(*columns))
+            self._csv_flushed = end
+        
+        self._csv_file.flush()
         
         return filepath
     
+    def close(self):
+        """
+        Fermer le fichier CSV ouvert par save_to_csv.
+        """
+        if self._csv_file is not None:
+            self._csv_file.close()
+        
+        self._csv_file = None
+        self._csv_writer = None
+        self._csv_path = None
+        self._csv_flushed = 0
+    
     def save_summary(self, filename=None, vehicle_count=0, avg_speed=0):
         """
         Sauvegarder un résumé des données des véhicules.
@@ -94,26 +296,28 @@ class DataStorage:
         filepath = os.path.join(self.output_dir, filename)
         
         # Calculer les statistiques si nous avons des données de véhicules
-        if self.vehicle_data:
-            df = pd.DataFrame(self.vehicle_data)
+        n = self._n
+        if n:
+            vehicle_ids = self._vid[:n]
             
             # Filtrer les valeurs de vitesse invalides
-            valid_speeds = df[df['speed'] >= 0]['speed']
+            valid_speeds = self._speed[:n][self._speed[:n] >= 0]
             
-            if not valid_speeds.empty:
+            if valid_speeds.size:
                 avg_speed = valid_speeds.mean()
                 min_speed = valid_speeds.min()
                 max_speed = valid_speeds.max()
-                std_speed = valid_speeds.std()
+                # Écart type de l'échantillon (ddof=1)
+                std_speed = valid_speeds.std(ddof=1) if valid_speeds.size > 1 else np.nan
             else:
                 avg_speed = min_speed = max_speed = std_speed = 0
             
             # Compter les véhicules uniques
             if vehicle_count == 0:
-                vehicle_count = df['vehicle_id'].nunique()
+                vehicle_count = np.unique(vehicle_ids).size
             
             # Compter les véhicules qui ont franchi la ligne
-            crossed_count = df[df['crossed_line'] == 1]['vehicle_id'].nunique()
+            crossed_count = np.unique(vehicle_ids[self._crossed[:n] == 1]).size
         else:
             min_speed = max_speed = std_speed = 0
             crossed_count = 0
@@ -155,52 +359,34 @@ class DataStorage:
         
         filepath = os.path.join(self.output_dir, filename)
         
-        # Calculer la distribution des vitesses si nous avons des données de véhicules
-        if self.vehicle_data:
-            df = pd.DataFrame(self.vehicle_data)
-            
-            # Filtrer les valeurs de vitesse invalides et obtenir la dernière mesure de vitesse pour chaque véhicule
-            valid_speeds = df[df['speed'] >= 0].sort_values('timestamp')
-            last_speeds = valid_speeds.drop_duplicates('vehicle_id', keep='last')['speed']
+        # Calculer l'histogramme de la dernière vitesse valide de chaque véhicule
+        n = self._n
+        counts, num_vehicles = _last_speed_histogram(
+            np.ascontiguousarray(self._ts[:n]),
+            np.ascontiguousarray(self._vid[:n]),
+            np.ascontiguousarray(self._speed[:n]),
+            int(bin_width)
+        )
+        
+        # Créer les données de distribution
+        distribution = []
+        for i, count in enumerate(counts.tolist()):
+            bin_start = i * bin_width
+            bin_end = bin_start + bin_width
             
-            if not last_speeds.empty:
-                # Créer des bacs pour l'histogramme
-                max_speed = int(np.ceil(last_speeds.max()))
-                bins = list(range(0, max_speed + bin_width, bin_width))
-                
-                # Calculer l'histogramme
-                hist, bin_edges = np.histogram(last_speeds, bins=bins)
-                
-                # Créer les données de distribution
-                distribution = []
-                for i in range(len(hist)):
-                    bin_start = bin_edges[i]
-                    bin_end = bin_edges[i+1]
-                    count = hist[i]
-                    
-                    distribution.append({
-                        'bin_start': bin_start,
-                        'bin_end': bin_end,
-                        'bin_label': f"{bin_start}-{bin_end} km/h",
-                        'count': count,
-                        'percentage': round((count / len(last_speeds)) * 100, 2)
-                    })
-                
-                # Sauvegarder dans un fichier CSV
-                with open(filepath, 'w', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=distribution[0].keys())
-                    writer.writeheader()
-                    writer.writerows(distribution)
-            else:
-                # Créer un fichier de distribution vide
-                with open(filepath, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['bin_start', 'bin_end', 'bin_label', 'count', 'percentage'])
-        else:
-            # Créer un fichier de distribution vide
-            with open(filepath, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['bin_start', 'bin_end', 'bin_label', 'count', 'percentage'])
+            distribution.append({
+                'bin_start': bin_start,
+                'bin_end': bin_end,
+                'bin_label': f"{bin_start}-{bin_end} km/h",
+                'count': count,
+                'percentage': round((count / num_vehicles) * 100, 2)
+            })
+        
+        # Sauvegarder dans un fichier CSV (seulement l'en-tête si aucune vitesse n'est disponible)
+        with open(filepath, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['bin_start', 'bin_end', 'bin_label', 'count', 'percentage'])
+            writer.writeheader()
+            writer.writerows(distribution)
         
         return filepath
     
@@ -219,17 +405,12 @@ class DataStorage:
         
         filepath = os.path.join(self.output_dir, filename)
         
-        # Convertir les horodatages en chaînes de caractères pour la sérialisation JSON
-        json_data = []
-        for record in self.vehicle_data:
-            json_record = record.copy()
-            if isinstance(json_record['timestamp'], (datetime.datetime, pd.Timestamp)):
-                json_record['timestamp'] = json_record['timestamp'].isoformat()
-            json_data.append(json_record)
+        # Sérialiser en une fois avec orjson ; les colonnes sont déjà converties en types natifs
+        json_bytes = orjson.dumps(self.vehicle_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
         
         # Sauvegarder dans un fichier JSON
-        with open(filepath, 'w') as f:
-            json.dump(json_data, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(json_bytes)
         
         return filepath
     
@@ -237,6 +418,7 @@ class DataStorage:
         """
         Effacer toutes les données de véhicules stockées.
         """
-        self.vehicle_data = []
+        self.close()
+        self._allocate(self.INITIAL_CAPACITY)
         self.session_start_time = datetime.datetime.now()
-        self.session_id = self.session_start_time.strftime("%Y%m%d_%H%M%S")
+        self.session_id = self.session_start_time.strftime(self.SESSION_ID_FORMAT)
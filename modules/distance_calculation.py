@@ -3,7 +3,7 @@ Module de calcul de la distance pour mesurer les distances réelles à partir de
 Ce module gère la conversion entre les distances en pixels et les mesures réelles.
 """
 
-import numpy as np
+import math
 import cv2
 
 class DistanceCalculator:
@@ -18,9 +18,10 @@ class DistanceCalculator:
         self.reference_width_pixels = reference_width_pixels
         self.reference_width_meters = reference_width_meters
         self.pixels_per_meter = None
+        self._meters_per_pixel = None  # Inverse de pixels_per_meter : les conversions multiplient au lieu de diviser
         
         if reference_width_pixels is not None and reference_width_meters is not None:
-            self.pixels_per_meter = reference_width_pixels / reference_width_meters
+            self.set_reference(reference_width_pixels, reference_width_meters)
     
     def set_reference(self, reference_width_pixels, reference_width_meters):
         """
@@ -33,6 +34,7 @@ class DistanceCalculator:
         self.reference_width_pixels = reference_width_pixels
         self.reference_width_meters = reference_width_meters
         self.pixels_per_meter = reference_width_pixels / reference_width_meters
+        self._meters_per_pixel = reference_width_meters / reference_width_pixels
     
     def pixel_to_meter(self, pixel_distance):
         """
@@ -47,7 +49,7 @@ class DistanceCalculator:
         if self.pixels_per_meter is None:
             raise ValueError("Les mesures de référence ne sont pas définies. Appelez set_reference() d'abord.")
         
-        return pixel_distance / self.pixels_per_meter
+        return pixel_distance * self._meters_per_pixel
     
     def meter_to_pixel(self, meter_distance):
         """
@@ -75,8 +77,8 @@ class DistanceCalculator:
         Retourne:
             Distance en mètres
         """
-        # Calculer la distance euclidienne en pixels
-        pixel_distance = np.sqrt((point2[0] - point1[0])**2 + (point2[1] - point1[1])**2)
+        # Calculer la distance euclidienne en pixels (math.hypot : pas de surcoût NumPy sur des scalaires)
+        pixel_distance = math.hypot(point2[0] - point1[0], point2[1] - point1[1])
         
         # Convertir en mètres
         return self.pixel_to_meter(pixel_distance)
@@ -103,7 +105,7 @@ class DistanceCalculator:
         self.set_reference(estimated_lane_width_pixels, lane_width_meters)
         return True
     
-    def draw_reference_line(self, frame, start_point=None, end_point=None, color=(0, 255, 255), thickness=2):
+    def draw_reference_line(self, frame, start_point=None, end_point=None, color=(0, 255, 255), thickness=2, inplace=True):
         """
         Dessiner une ligne de référence sur l'image pour visualiser la distance de calibration.
         
@@ -113,11 +115,12 @@ class DistanceCalculator:
             end_point: Point d'arrivée de la ligne (x, y)
             color: Couleur de la ligne (B, G, R)
             thickness: Épaisseur de la ligne
+            inplace: Dessiner directement sur l'image plutôt que sur une copie
             
         Retourne:
             Image avec la ligne de référence dessinée
         """
-        result_frame = frame.copy()
+        result_frame = frame if inplace else frame.copy()
         
         if start_point is None or end_point is None:
             # Si les points ne sont pas fournis, dessiner une ligne horizontale dans le tiers inférieur de l'image
@@ -130,8 +133,7 @@ class DistanceCalculator:
         
         # Calculer et afficher la distance
         if self.pixels_per_meter is not None:
-            pixel_distance = np.sqrt((end_point[0] - start_point[0])**2 + (end_point[1] - start_point[1])**2)
-            meter_distance = self.pixel_to_meter(pixel_distance)
+            meter_distance = self.calculate_distance(start_point, end_point)
             
             # Afficher la distance sur l'image
             mid_point = ((start_point[0] + end_point[0]) // 2, (start_point[1] + end_point[1]) // 2 - 10)
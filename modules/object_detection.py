@@ -8,6 +8,9 @@ import numpy as np
 import os
 
 class VehicleDetector:
+    # Facteur de réduction de l'image avant la soustraction de fond
+    DOWNSCALE = 2
+    
     def __init__(self, min_area=500, detection_line_position=0.6):
         """
         Initialiser le détecteur de véhicules.
@@ -16,60 +19,140 @@ class VehicleDetector:
             min_area (int): Aire minimale du contour à considérer comme un véhicule
             detection_line_position (float): Position de la ligne de détection (0-1)
         """
-        # Initialiser le soustracteur de fond
+        # Initialiser le soustracteur de fond (sans détection des ombres : le masque est déjà binaire, 0 ou 255)
         self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
             history=200, 
             varThreshold=25, 
-            detectShadows=True
+            detectShadows=False
         )
         
+        # Le premier masque du soustracteur (aucun fond encore appris) est entièrement au premier plan
+        # et donnerait une boîte couvrant toute l'image : il est ignoré
+        self._background_ready = False
+        
+        # Élément structurant des opérations morphologiques, créé une seule fois
+        self._morph_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+        
         self.min_area = min_area
         self.detection_line_position = detection_line_position
+        self._line_y_cache = (None, None)  # ((hauteur de l'image, position de la ligne), coordonnée y de la ligne)
         
-    def detect_vehicles(self, frame):
+        # Tampons de travail réutilisés d'une image à l'autre (alloués à la première image)
+        self._buffers_size = None
+        self._small_buf = None
+        self._gray_buf = None
+        self._fg_mask_buf = None
+        self._tmp_buf = None
+        
+    def _get_buffers_size(self, frame_shape):
+        """
+        Obtenir la taille de l'image réduite, en (ré)allouant les tampons de travail si elle change.
+        
+        Args:
+            frame_shape: Forme de l'image vidéo (hauteur, largeur, canaux)
+            
+        Retourne:
+            Taille (largeur, hauteur) de l'image réduite
+        """
+        size = (frame_shape[1] // self.DOWNSCALE, frame_shape[0] // self.DOWNSCALE)
+        if self._buffers_size != size:
+            width, height = size
+            self._small_buf = np.empty((height, width, 3), np.uint8)
+            self._gray_buf = np.empty((height, width), np.uint8)
+            self._fg_mask_buf = np.empty((height, width), np.uint8)
+            self._tmp_buf = np.empty((height, width), np.uint8)
+            self._buffers_size = size
+        return size
+    
+    def _get_line_y(self, frame_shape):
+        """
+        Obtenir la coordonnée y de la ligne de détection, recalculée seulement si la taille de l'image change.
+        
+        Args:
+            frame_shape: Forme de l'image vidéo (hauteur, largeur[, canaux])
+            
+        Retourne:
+            Coordonnée y de la ligne de détection
+        """
+        key = (frame_shape[0], self.detection_line_position)
+        if self._line_y_cache[0] != key:
+            self._line_y_cache = (key, int(frame_shape[0] * self.detection_line_position))
+        return self._line_y_cache[1]
+    
+    def detect_vehicles(self, frame, draw=True, inplace=True):
         """
         Détecter les véhicules dans l'image donnée.
         
         Args:
             frame: Image d'entrée de la vidéo
+            draw (bool): Dessiner les détections (sinon l'image est retournée telle quelle)
+            inplace (bool): Dessiner directement sur l'image d'entrée plutôt que sur une copie
             
         Retourne:
-            Liste des boîtes englobantes (x, y, w, h) pour les véhicules détectés
+            Tableau (N, 4) int32 des boîtes englobantes (x, y, w, h) des véhicules détectés,
+            image avec les détections dessinées et coordonnée y de la ligne de détection
         """
-        # Créer une copie de l'image
-        result_frame = frame.copy()
-        
-        # Appliquer la soustraction de fond
-        fg_mask = self.bg_subtractor.apply(frame)
-        
-        # Suppression du bruit avec des opérations morphologiques
-        kernel = np.ones((5, 5), np.uint8)
-        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, kernel)
-        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_CLOSE, kernel)
-        
-        # Seuil pour obtenir un masque binaire
-        _, fg_mask = cv2.threshold(fg_mask, 127, 255, cv2.THRESH_BINARY)
-        
-        # Trouver les contours
-        contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filtrer les contours en fonction de la surface et extraire les boîtes englobantes
-        bounding_boxes = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > self.min_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                bounding_boxes.append((x, y, w, h))
-                
-                # Dessiner la boîte englobante sur l'image résultante
-                cv2.rectangle(result_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-        
-        # Dessiner la ligne de détection
-        line_y = int(frame.shape[0] * self.detection_line_position)
-        cv2.line(result_frame, (0, line_y), (frame.shape[1], line_y), (0, 0, 255), 2)
+        # Appliquer la soustraction de fond sur une version réduite en niveaux de gris de l'image
+        # (chaque étape écrit dans un tampon préalloué au lieu d'allouer une nouvelle image)
+        frame_shape = frame.shape
+        small_size = self._get_buffers_size(frame_shape)
+        small = cv2.resize(frame, small_size, dst=self._small_buf, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+        fg_mask = self.bg_subtractor.apply(gray, fgmask=self._fg_mask_buf)
+        
+        if not self._background_ready:
+            # Image d'initialisation du fond : aucune détection
+            self._background_ready = True
+            bounding_boxes = np.empty((0, 4), dtype=np.int32)
+        else:
+            # Suppression du bruit avec des opérations morphologiques
+            cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self._morph_kernel, dst=self._tmp_buf)
+            fg_mask = cv2.morphologyEx(self._tmp_buf, cv2.MORPH_CLOSE, self._morph_kernel, dst=self._fg_mask_buf)
+            
+            # Trouver les contours
+            contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            
+            # Filtrer les contours en fonction de la surface (ramenée à l'échelle réduite) et extraire les boîtes englobantes
+            min_area = self.min_area / (self.DOWNSCALE * self.DOWNSCALE)
+            bounding_boxes = np.array(
+                [cv2.boundingRect(contour) for contour in contours if cv2.contourArea(contour) > min_area],
+                dtype=np.int32
+            ).reshape(-1, 4)
+            
+            # Ramener les boîtes englobantes à la résolution de l'image d'origine
+            bounding_boxes *= self.DOWNSCALE
+        
+        line_y = self._get_line_y(frame_shape)
+        
+        # Sans visualisation, éviter la copie et les dessins
+        if not draw:
+            return bounding_boxes, frame, line_y
+        
+        # Dessiner les boîtes englobantes et la ligne de détection (sur une copie si inplace est False)
+        result_frame = self.draw_detections(frame if inplace else frame.copy(), bounding_boxes, line_y)
         
         return bounding_boxes, result_frame, line_y
     
+    def draw_detections(self, frame, bounding_boxes, line_y):
+        """
+        Dessiner les boîtes englobantes et la ligne de détection directement sur l'image.
+        
+        Args:
+            frame: Image sur laquelle dessiner (modifiée en place)
+            bounding_boxes: Tableau (N, 4) ou liste des boîtes englobantes (x, y, w, h)
+            line_y: Coordonnée y de la ligne de détection
+            
+        Retourne:
+            Image avec les détections dessinées
+        """
+        for x, y, w, h in np.asarray(bounding_boxes).tolist():
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        
+        # Tracer la ligne de détection horizontale en remplissant directement ses rangées de pixels
+        frame[max(line_y - 1, 0):line_y + 2] = (0, 0, 255)
+        
+        return frame
+    
     def save_model(self, model_path):
         """
         Sauvegarder les paramètres du soustracteur de fond (espace réservé pour la sauvegarde du modèle).
@@ -6,8 +6,73 @@ Ce module calcule les vitesses des véhicules détectés et suivis dans la vidé
 import time
 import numpy as np
 import cv2
+from numba import njit
+
+
+# Signature explicite : compilation à l'import (rechargée depuis le cache ensuite), jamais à la première image
+@njit('void(int64[::1], float32[::1], float32[::1], float64, float32[::1], float32[::1], float64[::1], '
+      'float32[:, ::1], int32[::1], int32[::1], float64[::1], float64, float64[::1], boolean[::1])',
+      cache=True, fastmath=True, boundscheck=False)
+def _update_speeds(rows, center_x, center_y, current_time, last_x, last_y, last_t,
+                   speed_ring, ring_head, ring_count, speed_sum, meters_per_pixel, out_avg, out_valid):
+    """
+    Mettre à jour les positions et les vitesses moyennes des véhicules d'une image.
+    
+    Args:
+        rows: Lignes des véhicules dans les tableaux d'état (N,)
+        center_x: Abscisses des centres des véhicules en pixels (N,)
+        center_y: Ordonnées des centres des véhicules en pixels (N,)
+        current_time: Temps de l'image en secondes
+        last_x, last_y, last_t: Dernière position et dernier temps de chaque ligne (modifiés en place)
+        speed_ring: Tampon circulaire des dernières vitesses en km/h de chaque ligne (modifié en place)
+        ring_head: Prochaine case à écrire du tampon de chaque ligne (modifié en place)
+        ring_count: Nombre de vitesses dans le tampon de chaque ligne (modifié en place)
+        speed_sum: Somme glissante des vitesses du tampon de chaque ligne (modifiée en place)
+        meters_per_pixel: Facteur de conversion des pixels en mètres (mètres par pixel)
+        out_avg: Vitesse moyenne en km/h de chaque véhicule (N,) (sortie)
+        out_valid: Indique si une vitesse a été calculée pour le véhicule (N,) (sortie)
+    """
+    window = speed_ring.shape[1]
+    for k in range(rows.shape[0]):
+        r = rows[k]
+        out_valid[k] = False
+        
+        # Calculer le temps écoulé depuis la dernière position (nul pour un nouveau véhicule)
+        time_elapsed = current_time - last_t[r]
+        if time_elapsed > 0:
+            # Distance parcourue en mètres, puis vitesse en km/h
+            dx = center_x[k] - last_x[r]
+            dy = center_y[k] - last_y[r]
+            distance_meters = np.sqrt(dx * dx + dy * dy) * meters_per_pixel
+            speed_kmh = distance_meters / time_elapsed * 3.6
+            
+            # Ajouter au tampon des dernières vitesses, en retirant la plus ancienne de la somme s'il est plein
+            head = ring_head[r]
+            if ring_count[r] == window:
+                speed_sum[r] -= speed_ring[r, head]
+            else:
+                ring_count[r] += 1
+            speed_ring[r, head] = speed_kmh
+            speed_sum[r] += speed_ring[r, head]
+            ring_head[r] = (head + 1) % window
+            
+            # Vitesse moyenne sur les dernières mesures
+            out_avg[k] = speed_sum[r] / ring_count[r]
+            out_valid[k] = True
+        
+        # Mettre à jour la position et le temps
+        last_x[r] = center_x[k]
+        last_y[r] = center_y[k]
+        last_t[r] = current_time
+
 
 class SpeedCalculator:
+    # Nombre de dernières vitesses moyennées pour chaque véhicule
+    SPEED_WINDOW = 5
+    
+    # Nombre de véhicules suivis simultanément prévus (lignes préallouées des tableaux d'état)
+    MAX_TRACKS = 256
+    
     def __init__(self, distance_calculator, fps=None):
         """
         Initialiser le calculateur de vitesse.
@@ -18,20 +83,79 @@ class SpeedCalculator:
         """
         self.distance_calculator = distance_calculator
         self.fps = fps
-        self.vehicle_data = {}  # Dictionnaire pour stocker les données des véhicules pour le calcul de la vitesse
+        self.id_to_row = {}  # Ligne de chaque véhicule suivi dans les tableaux d'état ci-dessous
+        self._free_rows = []  # Lignes libérées par les véhicules disparus, réutilisées en priorité
+        self._num_rows = 0
+        self._allocate(self.MAX_TRACKS)
         self.last_frame_time = None
         self.speeds = {}  # Dictionnaire pour stocker les vitesses calculées pour chaque véhicule
+        
+        # Vitesses de la dernière mise à jour, dans l'ordre des véhicules passés à update()
+        self._last_avg_speeds = np.empty(0, np.float64)
+        self._last_has_speed = np.empty(0, np.bool_)
+    
+    def _allocate(self, capacity):
+        """
+        Allouer (ou agrandir, si plus de MAX_TRACKS véhicules sont suivis) les tableaux d'état des véhicules.
+        
+        Args:
+            capacity: Nombre de lignes des tableaux
+        """
+        if self._num_rows == 0:
+            self._last_x = np.empty(capacity, np.float32)
+            self._last_y = np.empty(capacity, np.float32)
+            self._last_t = np.empty(capacity, np.float64)  # float64 : les horodatages absolus dépassent la précision de float32
+            self._speed_ring = np.empty((capacity, self.SPEED_WINDOW), np.float32)
+            self._ring_head = np.zeros(capacity, np.int32)
+            self._ring_count = np.zeros(capacity, np.int32)
+            self._speed_sum = np.zeros(capacity, np.float64)
+        else:
+            for name in ('_last_x', '_last_y', '_last_t', '_speed_ring', '_ring_head', '_ring_count', '_speed_sum'):
+                array = getattr(self, name)
+                grown = np.zeros((capacity,) + array.shape[1:], array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+        self._capacity = capacity
+    
+    def _register(self, vehicle_id, current_time):
+        """
+        Attribuer une ligne des tableaux d'état à un nouveau véhicule.
+        
+        Args:
+            vehicle_id: ID du véhicule
+            current_time: Temps de la première image du véhicule en secondes
+            
+        Retourne:
+            Ligne attribuée au véhicule
+        """
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self._num_rows == self._capacity:
+                self._allocate(2 * self._capacity)
+            
+            row = self._num_rows
+            self._num_rows += 1
+        
+        # Un temps écoulé nul : la première position n'engendre pas de vitesse
+        self._last_t[row] = current_time
+        self._ring_head[row] = 0
+        self._ring_count[row] = 0
+        self._speed_sum[row] = 0.0
+        self.id_to_row[vehicle_id] = row
+        
+        return row
     
     def set_fps(self, fps):
         """
         Définir la valeur des frames par seconde.
         
         Args:
-            fps: Frames par seconde de la vidéo
+            fps: Frames par seconde de la vidéo (None pour utiliser les horodatages passés à update)
         """
         self.fps = fps
     
-    def update(self, vehicles, frame_number=None, current_time=None):
+    def update(self, vehicles, frame_number=None, current_time=None, bboxes=None):
         """
         Mettre à jour le calculateur de vitesse avec les nouvelles positions des véhicules.
         
@@ -39,6 +163,8 @@ class SpeedCalculator:
             vehicles: Dictionnaire des véhicules suivis avec leurs IDs et boîtes englobantes
             frame_number: Numéro de la frame actuelle (utilisé si fps est fourni)
             current_time: Temps actuel en secondes (utilisé si fps n'est pas fourni)
+            bboxes: Tableau (N, 4) des boîtes englobantes (x, y, w, h) dans l'ordre de vehicles
+                    (si None, reconstruit à partir de vehicles)
             
         Retourne:
             Dictionnaire des IDs des véhicules et leurs vitesses calculées
@@ -51,97 +177,95 @@ class SpeedCalculator:
             # Utiliser l'heure système si fps n'est pas fourni
             current_frame_time = current_time if current_time is not None else time.time()
         
-        # Initialiser last_frame_time si c'est la première mise à jour
-        if self.last_frame_time is None:
-            self.last_frame_time = current_frame_time
-            
-        time_delta = current_frame_time - self.last_frame_time
         self.last_frame_time = current_frame_time
         
-        # Mettre à jour les données des véhicules et calculer les vitesses
-        for vehicle_id, vehicle_data in vehicles.items():
-            bbox = vehicle_data['bbox']
-            
-            # Obtenir le point central du véhicule
-            x, y, w, h = bbox
-            center_x = x + w // 2
-            center_y = y + h // 2
-            current_position = (center_x, center_y)
-            
-            # Si c'est un nouveau véhicule, initialiser ses données
-            if vehicle_id not in self.vehicle_data:
-                self.vehicle_data[vehicle_id] = {
-                    'positions': [current_position],
-                    'times': [current_frame_time],
-                    'speeds': []
-                }
-            else:
-                # Obtenir la position précédente
-                prev_position = self.vehicle_data[vehicle_id]['positions'][-1]
-                
-                # Calculer la distance parcourue en mètres
-                distance_meters = self.distance_calculator.calculate_distance(prev_position, current_position)
-                
-                # Calculer le temps écoulé en secondes
-                if len(self.vehicle_data[vehicle_id]['times']) > 0:
-                    time_elapsed = current_frame_time - self.vehicle_data[vehicle_id]['times'][-1]
-                else:
-                    time_elapsed = time_delta
-                
-                # Calculer la vitesse en mètres par seconde
-                if time_elapsed > 0:
-                    speed_mps = distance_meters / time_elapsed
-                    
-                    # Convertir en km/h
-                    speed_kmh = speed_mps * 3.6
-                    
-                    # Ajouter à la liste des vitesses
-                    self.vehicle_data[vehicle_id]['speeds'].append(speed_kmh)
-                    
-                    # Calculer la vitesse moyenne sur les dernières mesures
-                    num_measurements = min(5, len(self.vehicle_data[vehicle_id]['speeds']))
-                    avg_speed = np.mean(self.vehicle_data[vehicle_id]['speeds'][-num_measurements:])
-                    
-                    # Stocker la vitesse moyenne
-                    self.speeds[vehicle_id] = avg_speed
-                
-                # Mettre à jour la position et le temps
-                self.vehicle_data[vehicle_id]['positions'].append(current_position)
-                self.vehicle_data[vehicle_id]['times'].append(current_frame_time)
-        
-        # Supprimer les véhicules qui ne sont plus suivis
-        for vehicle_id in list(self.vehicle_data.keys()):
-            if vehicle_id not in vehicles:
-                # Garder les données de vitesse mais supprimer l'historique des positions
-                if vehicle_id in self.speeds:
-                    final_speed = self.speeds[vehicle_id]
-                    self.speeds[vehicle_id] = final_speed
-                self.vehicle_data.pop(vehicle_id, None)
+        # Calculer les points centraux de tous les véhicules en une fois
+        num_vehicles = len(vehicles)
+        if bboxes is None:
+            bboxes = np.array(
+                [vehicle_data['bbox'] for vehicle_data in vehicles.values()], dtype=np.int32
+            )
+        bboxes = np.asarray(bboxes, dtype=np.int32).reshape(num_vehicles, 4)
+        center_x = (bboxes[:, 0] + (bboxes[:, 2] >> 1)).astype(np.float32)
+        center_y = (bboxes[:, 1] + (bboxes[:, 3] >> 1)).astype(np.float32)
         
-        return self.speeds
+        # Obtenir la ligne de chaque véhicule dans les tableaux d'état (en initialisant les nouveaux véhicules)
+        id_to_row = self.id_to_row
+        rows = np.fromiter(
+            (id_to_row[vehicle_id] if vehicle_id in id_to_row else self._register(vehicle_id, current_frame_time)
+             for vehicle_id in vehicles),
+            dtype=np.int64, count=num_vehicles
+        )
+        
+        # Mètres par pixel (pixel_to_meter lève ValueError si le calculateur n'est pas calibré)
+        meters_per_pixel = self.distance_calculator.pixel_to_meter(1.0) if num_vehicles else 0.0
+        
+        # Calculer les vitesses de tous les véhicules en une fois
+        avg_speeds = np.empty(num_vehicles, np.float64)
+        has_speed = np.empty(num_vehicles, np.bool_)
+        _update_speeds(
+            rows, center_x, center_y, float(current_frame_time),
+            self._last_x, self._last_y, self._last_t,
+            self._speed_ring, self._ring_head, self._ring_count, self._speed_sum,
+            float(meters_per_pixel),
+            avg_speeds, has_speed
+        )
+        
+        self._last_avg_speeds = avg_speeds
+        self._last_has_speed = has_speed
+        
+        # Stocker les vitesses moyennes
+        speeds = self.speeds
+        for vehicle_id, avg_speed, valid in zip(vehicles, avg_speeds.tolist(), has_speed.tolist()):
+            if valid:
+                speeds[vehicle_id] = avg_speed
+        
+        # Libérer les lignes des véhicules qui ne sont plus suivis (leurs vitesses sont conservées)
+        free_rows = self._free_rows
+        for vehicle_id in id_to_row.keys() - vehicles.keys():
+            free_rows.append(id_to_row.pop(vehicle_id))
+        
+        return speeds
+    
+    def get_speed_arrays(self):
+        """
+        Obtenir les vitesses calculées par la dernière mise à jour sous forme de tableaux NumPy.
+        
+        Retourne:
+            Tuple (vitesses moyennes en km/h (N,) float64, vitesse calculée (N,) bool)
+            dans l'ordre des véhicules passés au dernier appel à update()
+        """
+        return self._last_avg_speeds, self._last_has_speed
     
-    def draw_speeds(self, frame, vehicles):
+    def draw_speeds(self, frame, vehicle_ids, bboxes, inplace=True):
         """
         Dessiner les informations de vitesse sur l'image.
         
         Args:
             frame: Image sur laquelle dessiner
-            vehicles: Dictionnaire des véhicules suivis avec leurs IDs et boîtes englobantes
+            vehicle_ids: Tableau (N,) des IDs des véhicules suivis (voir VehicleTracker.get_vehicle_arrays)
+            bboxes: Tableau (N, 4) des boîtes englobantes (x, y, w, h) dans le même ordre
+            inplace: Dessiner directement sur l'image plutôt que sur une copie
             
         Retourne:
             Image avec les informations de vitesse dessinées
         """
-        result_frame = frame.copy()
-        
-        for vehicle_id, vehicle_data in vehicles.items():
-            if vehicle_id in self.speeds:
-                # Obtenir la boîte englobante du véhicule
-                x, y, w, h = vehicle_data['bbox']
-                
-                # Dessiner le texte de la vitesse au-dessus de la boîte englobante
-                speed_text = f"ID: {vehicle_id}, {self.speeds[vehicle_id]:.1f} km/h"
-                cv2.putText(result_frame, speed_text, (x, y - 5), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        result_frame = frame if inplace else frame.copy()
+        
+        # Préparer le texte de la vitesse de chaque véhicule, au-dessus de sa boîte englobante
+        speeds = self.speeds
+        annotations = [
+            (f"ID: {vehicle_id}, {speeds[vehicle_id]:.1f} km/h", (x, y - 5))
+            for vehicle_id, (x, y) in zip(np.asarray(vehicle_ids).tolist(), np.asarray(bboxes)[:, :2].tolist())
+            if vehicle_id in speeds
+        ]
+        
+        # Dessiner les textes avec des références locales à OpenCV
+        put_text = cv2.putText
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        color = (0, 255, 255)
+        for speed_text, position in annotations:
+            put_text(result_frame, speed_text, position, font, 0.5, color, 2)
         
         return result_frame
     
@@ -6,8 +6,12 @@ Ce module compte les véhicules qui traversent une ligne de détection spécifi
 import cv2
 import numpy as np
 import time
+from collections import deque
 
 class VehicleCounter:
+    # Nombre d'IDs de véhicules couverts initialement par le masque des véhicules comptés
+    INITIAL_MAX_IDS = 65536
+    
     def __init__(self, detection_line_position=0.6):
         """
         Initialiser le compteur de véhicules.
@@ -16,18 +20,34 @@ class VehicleCounter:
             detection_line_position (float): Position de la ligne de détection (0-1)
         """
         self.detection_line_position = detection_line_position
+        self._line_y_cache = (None, None)  # ((hauteur de l'image, position de la ligne), coordonnée y de la ligne)
         self.vehicle_count = 0
-        self.counted_vehicles = set()  # Ensemble des IDs des véhicules qui ont été comptés
-        self.count_history = []  # Liste des tuples (horodatage, comptage) pour une analyse basée sur le temps
+        self.counted_mask = np.zeros(self.INITIAL_MAX_IDS, dtype=np.bool_)  # Masque indexé par ID des véhicules qui ont été comptés
+        self.count_history = deque()  # File des tuples (horodatage, comptage) pour une analyse basée sur le temps
         self.last_update_time = time.time()
     
-    def update(self, vehicles, frame_shape, current_time=None):
+    def _get_line_y(self, frame_shape):
+        """
+        Obtenir la coordonnée y de la ligne de détection, recalculée seulement si la taille de l'image change.
+        
+        Args:
+            frame_shape: Forme de l'image vidéo (hauteur, largeur[, canaux])
+            
+        Retourne:
+            Coordonnée y de la ligne de détection
+        """
+        key = (frame_shape[0], self.detection_line_position)
+        if self._line_y_cache[0] != key:
+            self._line_y_cache = (key, int(frame_shape[0] * self.detection_line_position))
+        return self._line_y_cache[1]
+    
+    def update(self, vehicle_ids, crossed_line, current_time=None):
         """
-        Mettre à jour le compteur de véhicules avec les nouvelles positions des véhicules.
+        Mettre à jour le compteur de véhicules avec l'état des véhicules suivis.
         
         Args:
-            vehicles: Dictionnaire des véhicules suivis avec leurs IDs et boîtes englobantes
-            frame_shape: Forme de l'image vidéo (hauteur, largeur)
+            vehicle_ids: Tableau (N,) des IDs des véhicules suivis (voir VehicleTracker.get_vehicle_arrays)
+            crossed_line: Tableau (N,) booléen indiquant si chaque véhicule a franchi la ligne de détection
             current_time: Temps actuel en secondes (si None, utilise l'heure système)
             
         Retourne:
@@ -36,40 +56,47 @@ class VehicleCounter:
         if current_time is None:
             current_time = time.time()
         
-        # Calculer la coordonnée y de la ligne de détection
-        line_y = int(frame_shape[0] * self.detection_line_position)
+        vehicle_ids = np.asarray(vehicle_ids, dtype=np.int64)
+        crossed_line = np.asarray(crossed_line, dtype=np.bool_)
         
-        # Vérifier si des véhicules ont traversé la ligne
-        for vehicle_id, vehicle_data in vehicles.items():
-            if vehicle_id not in self.counted_vehicles:
-                # Vérifier si le véhicule a franchi la ligne
-                if vehicle_data.get('crossed_line', False):
-                    self.counted_vehicles.add(vehicle_id)
-                    self.vehicle_count += 1
-                    
-                    # Ajouter à l'historique des comptages
-                    self.count_history.append((current_time, self.vehicle_count))
+        if vehicle_ids.size:
+            # Agrandir le masque si un ID plus grand apparaît (les IDs du suiveur sont denses et croissants)
+            max_id = int(vehicle_ids.max())
+            capacity = self.counted_mask.shape[0]
+            if max_id >= capacity:
+                extra = max(max_id + 1, 2 * capacity) - capacity
+                self.counted_mask = np.concatenate((self.counted_mask, np.zeros(extra, dtype=np.bool_)))
+            
+            # Compter en une fois les véhicules qui viennent de franchir la ligne
+            newly_crossed_ids = vehicle_ids[crossed_line & ~self.counted_mask[vehicle_ids]]
+            if newly_crossed_ids.size:
+                self.counted_mask[newly_crossed_ids] = True
+                self.vehicle_count += int(newly_crossed_ids.size)
+                
+                # Ajouter à l'historique des comptages
+                self.count_history.append((current_time, self.vehicle_count))
         
         # Mettre à jour l'heure de la dernière mise à jour
         self.last_update_time = current_time
         
         return self.vehicle_count
     
-    def draw_counter(self, frame):
+    def draw_counter(self, frame, inplace=True):
         """
         Dessiner les informations du compteur sur l'image.
         
         Args:
             frame: Image sur laquelle dessiner
+            inplace: Dessiner directement sur l'image plutôt que sur une copie
             
         Retourne:
             Image avec les informations du compteur dessinées
         """
-        result_frame = frame.copy()
+        result_frame = frame if inplace else frame.copy()
         
-        # Dessiner la ligne de détection
-        line_y = int(frame.shape[0] * self.detection_line_position)
-        cv2.line(result_frame, (0, line_y), (frame.shape[1], line_y), (0, 0, 255), 2)
+        # Dessiner la ligne de détection (horizontale : ses rangées de pixels sont remplies directement)
+        line_y = self._get_line_y(frame.shape)
+        result_frame[max(line_y - 1, 0):line_y + 2] = (0, 0, 255)
         
         # Dessiner le texte du compteur
         counter_text = f"Comptage des véhicules : {self.vehicle_count}"
@@ -87,27 +114,33 @@ class VehicleCounter:
         """
         return self.vehicle_count
     
-    def get_count_rate(self, time_window=60):
+    def get_count_rate(self, time_window=60, current_time=None):
         """
         Calculer le taux de comptage des véhicules (véhicules par minute).
         
         Args:
             time_window: Fenêtre temporelle en secondes pour calculer le taux
+            current_time: Temps actuel en secondes, sur la même horloge que les temps passés à update()
+                          (si None, utilise le temps de la dernière mise à jour)
             
         Retourne:
             Taux de comptage des véhicules (véhicules par minute)
         """
-        # Filtrer l'historique des comptages pour ne prendre en compte que les entrées dans la fenêtre temporelle
-        current_time = time.time()
-        recent_counts = [(t, c) for t, c in self.count_history if current_time - t <= time_window]
+        # Retirer de l'historique des comptages les entrées sorties de la fenêtre temporelle
+        # (mesurée sur l'horloge des horodatages de l'historique : temps de la vidéo ou heure système)
+        if current_time is None:
+            current_time = self.last_update_time
+        count_history = self.count_history
+        while count_history and current_time - count_history[0][0] > time_window:
+            count_history.popleft()
         
-        if not recent_counts:
+        if not count_history:
             return 0
         
         # Calculer le taux basé sur le changement de comptage au fil du temps
-        if len(recent_counts) >= 2:
-            start_time, start_count = recent_counts[0]
-            end_time, end_count = recent_counts[-1]
+        if len(count_history) >= 2:
+            start_time, start_count = count_history[0]
+            end_time, end_count = count_history[-1]
             
             time_diff = end_time - start_time
             count_diff = end_count - start_count
@@ -124,6 +157,6 @@ class VehicleCounter:
         Réinitialiser le compteur.
         """
         self.vehicle_count = 0
-        self.counted_vehicles.clear()
+        self.counted_mask.fill(False)
         self.count_history.clear()
         self.last_update_time = time.time()
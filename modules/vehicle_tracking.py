@@ -1,11 +1,182 @@
 """
 Module de suivi des véhicules pour suivre les véhicules détectés à travers plusieurs frames.
-Ce module implémente un algorithme simple de suivi basé sur le recouvrement des boîtes englobantes.
+Ce module implémente un algorithme de suivi basé sur le recouvrement des boîtes englobantes,
+avec une affectation optimale (algorithme hongrois) entre véhicules suivis et détections,
+remplacée par un appariement glouton compilé (Numba) dans les scènes très chargées.
 """
 
+import itertools
+import numbers
+from collections.abc import Mapping
 import numpy as np
+from numba import njit, prange
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import cKDTree
+
+
+# Signature explicite : compilation à l'import (rechargée depuis le cache ensuite), jamais à la première image
+@njit('Tuple((int64[::1], float32[::1]))(int16[:, ::1], int16[:, ::1], float32[::1], float32[::1], float64)',
+      parallel=True, cache=True, fastmath=True, boundscheck=False)
+def _match_greedy(tracks, detections, track_areas, detection_areas, threshold):
+    """
+    Trouver pour chaque véhicule suivi la détection de meilleur recouvrement au-dessus du seuil,
+    sans construire la matrice des recouvrements (calcul et recherche du maximum fusionnés).
+    
+    Args:
+        tracks: Boîtes englobantes (K, 4) des véhicules suivis (x1, y1, x2, y2)
+        detections: Boîtes englobantes (N, 4) des détections (x1, y1, x2, y2)
+        track_areas: Surfaces (K,) des boîtes des véhicules suivis
+        detection_areas: Surfaces (N,) des boîtes des détections
+        threshold: Ratio de recouvrement à dépasser
+        
+    Retourne:
+        Tuple (indice (K,) de la meilleure détection de chaque véhicule, -1 si aucune ne dépasse le seuil,
+        ratio de recouvrement (K,) correspondant, 0 si aucune)
+    """
+    n_tracks = tracks.shape[0]
+    n_detections = detections.shape[0]
+    best_idx = np.empty(n_tracks, dtype=np.int64)
+    best_iou = np.empty(n_tracks, dtype=np.float32)
+    
+    for i in prange(n_tracks):
+        x1 = tracks[i, 0]
+        y1 = tracks[i, 1]
+        x2 = tracks[i, 2]
+        y2 = tracks[i, 3]
+        
+        best_j = -1
+        best = np.float32(threshold)
+        for j in range(n_detections):
+            # Test de séparation des axes avant de calculer l'intersection
+            # (les coordonnées int16 sont promues en entiers 64 bits par Numba, sans débordement)
+            inter_w = min(x2, detections[j, 2]) - max(x1, detections[j, 0])
+            if inter_w <= 0:
+                continue
+            inter_h = min(y2, detections[j, 3]) - max(y1, detections[j, 1])
+            if inter_h <= 0:
+                continue
+            
+            intersection_area = inter_w * inter_h
+            iou = intersection_area / (track_areas[i] + detection_areas[j] - intersection_area)
+            if iou > best:
+                best = iou
+                best_j = j
+        
+        best_idx[i] = best_j
+        best_iou[i] = best if best_j >= 0 else 0
+    
+    return best_idx, best_iou
+
+
+class VehicleView(Mapping):
+    """
+    Vue en lecture seule des véhicules d'un suiveur {id: {'bbox': (x,y,w,h), 'disappeared': count, 'crossed_line': bool}},
+    lue à la demande dans ses tableaux d'état : le dictionnaire n'est construit que si les valeurs sont lues,
+    au plus une fois par mise à jour du suiveur.
+    """
+    
+    def __init__(self, tracker, active_only=False):
+        """
+        Initialiser la vue.
+        
+        Args:
+            tracker: Suiveur de véhicules dont les tableaux d'état sont lus
+            active_only (bool): Ne présenter que les véhicules détectés dans la dernière image
+        """
+        self._tracker = tracker
+        self._active_only = active_only
+        self._cache = (None, None)  # (version de l'état du suiveur, dictionnaire construit)
+    
+    def _mask(self):
+        """
+        Obtenir le masque (K,) des véhicules présentés par la vue.
+        """
+        tracker = self._tracker
+        if self._active_only:
+            return tracker._disappeared == 0
+        return np.ones(len(tracker._ids), dtype=np.bool_)
+    
+    def _as_dict(self):
+        """
+        Construire (ou reprendre du cache si l'état n'a pas changé) le dictionnaire des véhicules de la vue.
+        """
+        version = self._tracker._version
+        if self._cache[0] != version:
+            self._cache = (version, self._tracker._as_dict(self._mask()))
+        return self._cache[1]
+    
+    def __len__(self):
+        if self._active_only:
+            return int(np.count_nonzero(self._tracker._disappeared == 0))
+        return len(self._tracker._ids)
+    
+    def __iter__(self):
+        ids = self._tracker._ids
+        if self._active_only:
+            ids = ids[self._tracker._disappeared == 0]
+        return iter(ids.tolist())
+    
+    def __contains__(self, vehicle_id):
+        return self._row(vehicle_id) is not None
+    
+    def _row(self, vehicle_id):
+        """
+        Trouver la ligne d'un véhicule de la vue dans les tableaux d'état (les IDs y sont croissants).
+        
+        Args:
+            vehicle_id: ID du véhicule
+            
+        Retourne:
+            Ligne du véhicule, ou None s'il n'appartient pas à la vue
+        """
+        # Une clé non entière (chaîne, flottant, None...) n'est jamais un ID de véhicule
+        if not isinstance(vehicle_id, numbers.Integral):
+            return None
+        
+        tracker = self._tracker
+        ids = tracker._ids
+        row = int(np.searchsorted(ids, vehicle_id))
+        if row == len(ids) or ids[row] != vehicle_id:
+            return None
+        if self._active_only and tracker._disappeared[row] != 0:
+            return None
+        return row
+    
+    def __getitem__(self, vehicle_id):
+        row = self._row(vehicle_id)
+        if row is None:
+            raise KeyError(vehicle_id)
+        
+        tracker = self._tracker
+        return {
+            'bbox': tuple(tracker._to_xywh(tracker._bboxes[row:row + 1])[0].tolist()),
+            'disappeared': int(tracker._disappeared[row]),
+            'crossed_line': bool(tracker._crossed[row])
+        }
+    
+    def items(self):
+        # Copier les dictionnaires internes : le cache partagé ne doit pas être modifiable par l'appelant
+        return [(vehicle_id, dict(vehicle)) for vehicle_id, vehicle in self._as_dict().items()]
+    
+    def values(self):
+        return [dict(vehicle) for vehicle in self._as_dict().values()]
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self._as_dict()!r})"
+
 
 class VehicleTracker:
+    # Nombre de paires (véhicule, détection) à partir duquel l'affectation hongroise est remplacée
+    # par l'appariement glouton compilé
+    GREEDY_MATCH_MIN_PAIRS = 4096
+    
+    # Nombre de véhicules et de boîtes englobantes à partir duquel les paires à comparer
+    # sont présélectionnées avec un arbre k-d sur les centres
+    KDTREE_MIN_BOXES = 30
+    
+    # Capacité initiale du masque des IDs ayant franchi la ligne (doublée si un ID plus grand apparaît)
+    INITIAL_CROSSED_CAPACITY = 1024
+    
     def __init__(self, max_disappeared=10, min_overlap_ratio=0.3):
         """
         Initialiser le suiveur de véhicules.
@@ -15,122 +186,380 @@ class VehicleTracker:
             min_overlap_ratio (float): Ratio de recouvrement minimal pour considérer que c'est le même véhicule
         """
         self.next_vehicle_id = 0
-        self.vehicles = {}  # Dictionnaire pour stocker les véhicules actifs {id: {'bbox': (x,y,w,h), 'disappeared': count}}
+        
+        # État des véhicules suivis en structure de tableaux (une ligne par véhicule, dans l'ordre d'enregistrement)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._bboxes = np.empty((0, 4), dtype=np.int16)  # Coins (x1, y1, x2, y2) en pixels
+        self._disappeared = np.empty(0, dtype=np.int32)
+        self._crossed = np.empty(0, dtype=np.bool_)
+        self._areas = np.empty(0, dtype=np.float32)  # Surfaces des boîtes, mises à jour avec _bboxes
+        self._first_bboxes = np.empty((0, 4), dtype=np.int16)  # Coins de la boîte à la première détection
+        
         self.max_disappeared = max_disappeared
         self.min_overlap_ratio = min_overlap_ratio
-        self.crossed_vehicles = set()  # Ensemble des IDs des véhicules ayant franchi la ligne de détection
         
-    def _calculate_overlap(self, bbox1, bbox2):
+        # Masque indexé par ID des véhicules ayant franchi la ligne de détection, et leur nombre
+        self._crossed_bits = np.zeros(self.INITIAL_CROSSED_CAPACITY, dtype=np.bool_)
+        self._crossed_count = 0
+        
+        # Vues paresseuses des véhicules (tous, ou seulement les actifs), invalidées par le numéro de version
+        # de l'état : toute méthode qui modifie les tableaux d'état doit l'incrémenter
+        self._version = 0
+        self._vehicles_view = VehicleView(self)
+        self.active_view = VehicleView(self, active_only=True)
+        
+    def _iou_matrix(self, boxes_a, boxes_b, area_a=None, area_b=None, candidates=None):
+        """
+        Calculer en une fois les ratios de recouvrement entre deux séries de boîtes englobantes.
+        
+        Args:
+            boxes_a: Tableau (N, 4) int16 des premières boîtes englobantes (x1, y1, x2, y2)
+            boxes_b: Tableau (M, 4) int16 des deuxièmes boîtes englobantes (x1, y1, x2, y2)
+            area_a: Surfaces (N,) déjà calculées des premières boîtes (si None, calculées ici)
+            area_b: Surfaces (M,) déjà calculées des deuxièmes boîtes (si None, calculées ici)
+            candidates: Tuple (indices dans boxes_a, indices dans boxes_b) des seules paires à comparer
+                        (si None, toutes les paires sont comparées)
+            
+        Retourne:
+            Matrice (N, M) des ratios de recouvrement (aire de l'intersection / aire de l'union)
+        """
+        # Test de séparation des axes : seules les paires qui se recouvrent sur les deux axes peuvent s'intersecter
+        if candidates is None:
+            top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+            bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+            wh = bottom_right - top_left
+            rows, cols = np.nonzero((wh[..., 0] > 0) & (wh[..., 1] > 0))
+            pair_wh = wh[rows, cols]
+        else:
+            rows, cols = candidates
+            pair_wh = (np.minimum(boxes_a[rows, 2:], boxes_b[cols, 2:])
+                       - np.maximum(boxes_a[rows, :2], boxes_b[cols, :2]))
+            overlapping = (pair_wh[:, 0] > 0) & (pair_wh[:, 1] > 0)
+            rows, cols, pair_wh = rows[overlapping], cols[overlapping], pair_wh[overlapping]
+        
+        # Calculer les surfaces (si elles ne sont pas fournies)
+        if area_a is None:
+            area_a = self._box_areas(boxes_a)
+        if area_b is None:
+            area_b = self._box_areas(boxes_b)
+        
+        # Calculer les ratios de recouvrement des seules paires qui se recouvrent (nuls pour les autres)
+        overlaps = np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+        if rows.size:
+            # Promouvoir en int32 pour le produit, qui déborderait en int16
+            intersection_area = (pair_wh[:, 0].astype(np.int32) * pair_wh[:, 1]).astype(np.float32)
+            union_area = area_a[rows] + area_b[cols] - intersection_area
+            overlaps[rows, cols] = intersection_area / union_area
+        
+        return overlaps
+    
+    def _candidate_pairs(self, boxes):
+        """
+        Présélectionner avec un arbre k-d sur les centres les paires (véhicule suivi, boîte englobante)
+        qui peuvent se recouvrir.
+        
+        Args:
+            boxes: Tableau (N, 4) int16 des boîtes englobantes (x1, y1, x2, y2)
+            
+        Retourne:
+            Tuple (lignes des véhicules, indices des boîtes englobantes) des paires candidates
+        """
+        tracks = self._bboxes.astype(np.float32)
+        boxes = boxes.astype(np.float32)
+        track_centers = (tracks[:, :2] + tracks[:, 2:]) * 0.5
+        box_centers = (boxes[:, :2] + boxes[:, 2:]) * 0.5
+        
+        # Deux boîtes ne se recouvrent que si leurs centres sont plus proches, sur chaque axe,
+        # que la somme de leurs demi-dimensions : le rayon de recherche de chaque véhicule en découle
+        half_sizes = ((tracks[:, 2:] - tracks[:, :2]) + (boxes[:, 2:] - boxes[:, :2]).max(axis=0)) * 0.5
+        radii = np.hypot(half_sizes[:, 0], half_sizes[:, 1])
+        
+        neighbors = cKDTree(box_centers).query_ball_point(track_centers, radii, return_sorted=False)
+        counts = np.fromiter(map(len, neighbors), dtype=np.int64, count=len(neighbors))
+        rows = np.repeat(np.arange(len(neighbors)), counts)
+        cols = np.fromiter(itertools.chain.from_iterable(neighbors), dtype=np.int64, count=int(counts.sum()))
+        
+        return rows, cols
+    
+    @staticmethod
+    def _box_areas(corners):
         """
-        Calculer le ratio de recouvrement entre deux boîtes englobantes.
+        Calculer les surfaces de boîtes englobantes données par leurs coins.
         
         Args:
-            bbox1: Première boîte englobante (x, y, w, h)
-            bbox2: Deuxième boîte englobante (x, y, w, h)
+            corners: Tableau (N, 4) int16 des boîtes englobantes (x1, y1, x2, y2)
             
         Retourne:
-            Ratio de recouvrement (aire de l'intersection / aire de l'union)
+            Surfaces (N,) float32 des boîtes
+        """
+        # Promouvoir en int32 pour le produit, qui déborderait en int16
+        return ((corners[:, 2] - corners[:, 0]).astype(np.int32) * (corners[:, 3] - corners[:, 1])).astype(np.float32)
+    
+    @staticmethod
+    def _to_xywh(corners):
+        """
+        Convertir des boîtes englobantes données par leurs coins au format (x, y, w, h) de l'API.
+        
+        Args:
+            corners: Tableau (N, 4) int16 des boîtes englobantes (x1, y1, x2, y2)
+            
+        Retourne:
+            Tableau (N, 4) int32 des boîtes englobantes (x, y, w, h)
+        """
+        xywh = corners.astype(np.int32)
+        xywh[:, 2:] -= xywh[:, :2]
+        return xywh
+    
+    def _greedy_assignment(self, boxes, box_areas):
+        """
+        Apparier véhicules suivis et boîtes englobantes par meilleur recouvrement de chaque véhicule,
+        une boîte revendiquée par plusieurs véhicules revenant à celui de plus fort recouvrement
+        et les autres étant réappariés avec les boîtes restées libres.
+        
+        Args:
+            boxes: Tableau (N, 4) int16 des boîtes englobantes (x1, y1, x2, y2)
+            box_areas: Surfaces (N,) float32 des boîtes englobantes
+            
+        Retourne:
+            Tuple (lignes des véhicules appariés, indices des boîtes correspondantes)
+        """
+        best_idx, best_iou = _match_greedy(self._bboxes, boxes, self._areas, box_areas,
+                                           float(self.min_overlap_ratio))
+        
+        # Parcourir les véhicules appariés par recouvrement décroissant et garder le premier de chaque boîte
+        candidates = np.flatnonzero(best_idx >= 0)
+        ordered = candidates[np.argsort(-best_iou[candidates], kind='stable')]
+        _, first = np.unique(best_idx[ordered], return_index=True)
+        rows = ordered[first]
+        cols = best_idx[rows]
+        
+        # Réapparier les véhicules perdants des conflits avec les boîtes restées libres
+        # (affectation hongroise sur la sous-matrice résiduelle, petite)
+        losers = np.setdiff1d(candidates, rows, assume_unique=True)
+        if losers.size:
+            free = np.ones(len(boxes), dtype=np.bool_)
+            free[cols] = False
+            free_cols = np.flatnonzero(free)
+            if free_cols.size:
+                overlaps = self._iou_matrix(self._bboxes[losers], boxes[free_cols],
+                                            area_a=self._areas[losers], area_b=box_areas[free_cols])
+                loser_rows, free_idx = linear_sum_assignment(overlaps, maximize=True)
+                residual = overlaps[loser_rows, free_idx]
+                valid = (residual > 0) & (residual > self.min_overlap_ratio)
+                rows = np.concatenate((rows, losers[loser_rows[valid]]))
+                cols = np.concatenate((cols, free_cols[free_idx[valid]]))
+        
+        return rows, cols
+    
+    @property
+    def crossed_vehicles(self):
         """
-        # Extraire les coordonnées
-        x1, y1, w1, h1 = bbox1
-        x2, y2, w2, h2 = bbox2
+        Ensemble des IDs des véhicules ayant franchi la ligne de détection, construit à partir du masque.
+        """
+        return set(np.flatnonzero(self._crossed_bits).tolist())
+    
+    def _mark_crossed(self, vehicle_ids):
+        """
+        Marquer des véhicules comme ayant franchi la ligne de détection.
         
-        # Calculer les coordonnées d'intersection
-        x_left = max(x1, x2)
-        y_top = max(y1, y2)
-        x_right = min(x1 + w1, x2 + w2)
-        y_bottom = min(y1 + h1, y2 + h2)
+        Args:
+            vehicle_ids: Tableau des IDs des véhicules
+        """
+        if vehicle_ids.size == 0:
+            return
         
-        # Vérifier s'il y a une intersection
-        if x_right < x_left or y_bottom < y_top:
-            return 0.0
+        # Agrandir le masque si un ID plus grand apparaît (les IDs sont denses et croissants)
+        max_id = int(vehicle_ids.max())
+        capacity = self._crossed_bits.shape[0]
+        if max_id >= capacity:
+            extra = max(max_id + 1, 2 * capacity) - capacity
+            self._crossed_bits = np.concatenate((self._crossed_bits, np.zeros(extra, dtype=np.bool_)))
         
-        # Calculer les surfaces
-        intersection_area = (x_right - x_left) * (y_bottom - y_top)
-        bbox1_area = w1 * h1
-        bbox2_area = w2 * h2
-        union_area = bbox1_area + bbox2_area - intersection_area
+        self._crossed_count += int(np.count_nonzero(~self._crossed_bits[vehicle_ids]))
+        self._crossed_bits[vehicle_ids] = True
+    
+    @property
+    def vehicles(self):
+        """
+        Vue des véhicules suivis {id: {'bbox': (x,y,w,h), 'disappeared': count, 'crossed_line': bool}},
+        lue à la demande dans les tableaux d'état (dict(tracker.vehicles) pour en obtenir une copie).
+        """
+        return self._vehicles_view
+    
+    def _as_dict(self, mask):
+        """
+        Construire le dictionnaire des véhicules sélectionnés par un masque.
+        
+        Args:
+            mask: Tableau booléen (K,) des véhicules à inclure
+            
+        Retourne:
+            Dictionnaire {id: {'bbox', 'disappeared', 'crossed_line'}}
+        """
+        return {
+            vehicle_id: {
+                'bbox': tuple(bbox),
+                'disappeared': disappeared,
+                'crossed_line': crossed
+            }
+            for vehicle_id, bbox, disappeared, crossed in zip(
+                self._ids[mask].tolist(), self._to_xywh(self._bboxes[mask]).tolist(),
+                self._disappeared[mask].tolist(), self._crossed[mask].tolist()
+            )
+        }
+    
+    def _compact(self, keep):
+        """
+        Supprimer les véhicules non conservés des tableaux d'état.
         
-        # Calculer le ratio de recouvrement
-        overlap_ratio = intersection_area / float(union_area)
+        Args:
+            keep: Tableau booléen (K,) des véhicules à conserver
+        """
+        if keep.all():
+            return
         
-        return overlap_ratio
+        self._version += 1
+        self._ids = self._ids[keep]
+        self._bboxes = self._bboxes[keep]
+        self._disappeared = self._disappeared[keep]
+        self._crossed = self._crossed[keep]
+        self._areas = self._areas[keep]
+        self._first_bboxes = self._first_bboxes[keep]
     
     def update(self, bounding_boxes, detection_line_y):
         """
-        Mettre à jour le suiveur avec de nouvelles boîtes englobantes.
+        Mettre à jour le suiveur avec de nouvelles boîtes englobantes (voir step()).
         
         Args:
-            bounding_boxes: Liste des boîtes englobantes (x, y, w, h) pour les véhicules détectés
+            bounding_boxes: Tableau (N, 4) des boîtes englobantes (x, y, w, h) pour les véhicules détectés
             detection_line_y: Coordonnée y de la ligne de détection
             
         Retourne:
-            Dictionnaire des véhicules suivis avec leurs IDs et boîtes englobantes
+            Vue (VehicleView) des véhicules suivis avec leurs IDs et boîtes englobantes
+        """
+        return self.step(bounding_boxes, detection_line_y)
+    
+    def step(self, bounding_boxes, detection_line_y):
         """
+        Faire avancer le suiveur d'une image : appariement, mise à jour, franchissement de la ligne,
+        suppression des véhicules disparus et enregistrement des nouveaux, en une seule méthode.
+        
+        Args:
+            bounding_boxes: Tableau (N, 4) des boîtes englobantes (x, y, w, h) pour les véhicules détectés
+            detection_line_y: Coordonnée y de la ligne de détection
+            
+        Retourne:
+            Vue (VehicleView) des véhicules suivis avec leurs IDs et boîtes englobantes
+        """
+        self._version += 1
+        
+        # Références locales aux paramètres et aux tableaux d'état (valables jusqu'à _compact et _register_corners,
+        # qui remplacent les tableaux)
+        max_disappeared = self.max_disappeared
+        min_overlap_ratio = self.min_overlap_ratio
+        ids = self._ids
+        bboxes = self._bboxes
+        disappeared = self._disappeared
+        crossed = self._crossed
+        areas = self._areas
+        
+        # Convertir une seule fois les boîtes englobantes en coins (x1, y1, x2, y2) int16
+        # (les coordonnées en pixels des images vidéo tiennent largement dans un int16)
+        boxes = np.array(bounding_boxes, dtype=np.int16).reshape(-1, 4)
+        boxes[:, 2:] += boxes[:, :2]
+        
         # Si aucune boîte englobante, marquer tous les véhicules existants comme disparus
-        if len(bounding_boxes) == 0:
-            for vehicle_id in list(self.vehicles.keys()):
-                self.vehicles[vehicle_id]['disappeared'] += 1
-                
-                # Supprimer le véhicule s'il a disparu trop longtemps
-                if self.vehicles[vehicle_id]['disappeared'] > self.max_disappeared:
-                    del self.vehicles[vehicle_id]
-                    
+        # et supprimer ceux qui ont disparu trop longtemps
+        if len(boxes) == 0:
+            disappeared += 1
+            self._compact(disappeared <= max_disappeared)
             return self.vehicles
         
         # Si aucun véhicule existant, enregistrer toutes les boîtes englobantes comme nouveaux véhicules
-        if len(self.vehicles) == 0:
-            for bbox in bounding_boxes:
-                self.register(bbox, detection_line_y)
-        else:
-            # Essayer de faire correspondre les véhicules existants avec les nouvelles boîtes englobantes
-            vehicle_ids = list(self.vehicles.keys())
-            vehicle_bboxes = [self.vehicles[vehicle_id]['bbox'] for vehicle_id in vehicle_ids]
-            
-            # Suivre quels véhicules et quelles boîtes englobantes ont été appariés
-            used_vehicles = set()
-            used_bboxes = set()
+        if len(ids) == 0:
+            self._register_corners(boxes, self._box_areas(boxes), detection_line_y)
+        elif len(ids) == 1 and len(boxes) == 1:
+            # Cas fréquent d'un seul véhicule et d'une seule boîte englobante : calculer le recouvrement
+            # en scalaires, sans matrice ni affectation
+            x1, y1, x2, y2 = bboxes[0].tolist()
+            box_x1, box_y1, box_x2, box_y2 = boxes[0].tolist()
+            box_area = (box_x2 - box_x1) * (box_y2 - box_y1)
+            overlap = 0.0
+            inter_w = min(x2, box_x2) - max(x1, box_x1)
+            inter_h = min(y2, box_y2) - max(y1, box_y1)
+            if inter_w > 0 and inter_h > 0:
+                intersection_area = inter_w * inter_h
+                overlap = intersection_area / (float(areas[0]) + box_area - intersection_area)
             
-            # Pour chaque véhicule, trouver la meilleure boîte englobante correspondante
-            for i, vehicle_id in enumerate(vehicle_ids):
-                vehicle_bbox = vehicle_bboxes[i]
+            if overlap > min_overlap_ratio:
+                # Mettre à jour le véhicule apparié et vérifier s'il vient de franchir la ligne de détection
+                bboxes[0] = boxes[0]
+                areas[0] = box_area
+                disappeared[0] = 0
+                if box_y2 >= detection_line_y and not crossed[0]:
+                    crossed[0] = True
+                    self._mark_crossed(ids[:1])
+            else:
+                # Le véhicule n'est pas apparié et la boîte englobante devient un nouveau véhicule
+                disappeared[0] += 1
+                self._compact(disappeared <= max_disappeared)
+                self._register_corners(boxes, np.array([box_area], dtype=np.float32), detection_line_y)
+        else:
+            # Apparier véhicules et boîtes englobantes, avec les surfaces en cache des véhicules suivis
+            box_areas = self._box_areas(boxes)
+            if len(ids) * len(boxes) >= self.GREEDY_MATCH_MIN_PAIRS:
+                # Beaucoup de paires : appariement glouton compilé, sans matrice intermédiaire
+                matched_rows, matched_cols = self._greedy_assignment(boxes, box_areas)
+            else:
+                # Beaucoup de véhicules et de boîtes : ne comparer que les paires proches
+                candidates = None
+                if len(ids) >= self.KDTREE_MIN_BOXES and len(boxes) >= self.KDTREE_MIN_BOXES:
+                    candidates = self._candidate_pairs(boxes)
                 
-                max_overlap = 0
-                max_overlap_idx = -1
+                overlaps = self._iou_matrix(bboxes, boxes, area_a=areas, area_b=box_areas,
+                                            candidates=candidates)
                 
-                for j, bbox in enumerate(bounding_boxes):
-                    if j in used_bboxes:
-                        continue
-                    
-                    overlap = self._calculate_overlap(vehicle_bbox, bbox)
-                    
-                    if overlap > max_overlap and overlap > self.min_overlap_ratio:
-                        max_overlap = overlap
-                        max_overlap_idx = j
+                # Meilleure boîte de chaque véhicule en un seul balayage de la matrice : si aucune boîte
+                # n'est revendiquée par deux véhicules, cette affectation est déjà optimale
+                best_cols = overlaps.argmax(axis=1)
+                best_overlaps = overlaps[np.arange(len(best_cols)), best_cols]
+                matched_rows = np.flatnonzero(best_overlaps > 0)
+                matched_cols = best_cols[matched_rows]
+                if np.unique(matched_cols).size != matched_cols.size:
+                    # Affectation optimale (algorithme hongrois) maximisant le recouvrement total
+                    matched_rows, matched_cols = linear_sum_assignment(overlaps, maximize=True)
                 
-                # Si une correspondance a été trouvée, mettre à jour le véhicule
-                if max_overlap_idx != -1:
-                    self.vehicles[vehicle_id]['bbox'] = bounding_boxes[max_overlap_idx]
-                    self.vehicles[vehicle_id]['disappeared'] = 0
-                    used_vehicles.add(vehicle_id)
-                    used_bboxes.add(max_overlap_idx)
-                    
-                    # Vérifier si le véhicule a franchi la ligne de détection
-                    self._check_line_crossing(vehicle_id, bounding_boxes[max_overlap_idx], detection_line_y)
+                # Ne garder que les paires dont le recouvrement dépasse le seuil
+                matched_overlaps = overlaps[matched_rows, matched_cols]
+                valid = (matched_overlaps > 0) & (matched_overlaps > min_overlap_ratio)
+                matched_rows = matched_rows[valid]
+                matched_cols = matched_cols[valid]
+            
+            # Mettre à jour les véhicules appariés
+            bboxes[matched_rows] = boxes[matched_cols]
+            areas[matched_rows] = box_areas[matched_cols]
+            disappeared[matched_rows] = 0
             
-            # Marquer les véhicules non appariés comme disparus
-            for vehicle_id in vehicle_ids:
-                if vehicle_id not in used_vehicles:
-                    self.vehicles[vehicle_id]['disappeared'] += 1
-                    
-                    # Supprimer le véhicule s'il a disparu trop longtemps
-                    if self.vehicles[vehicle_id]['disappeared'] > self.max_disappeared:
-                        del self.vehicles[vehicle_id]
+            # Vérifier en une fois quels véhicules appariés viennent de franchir la ligne de détection,
+            # en ne testant que ceux qui ne l'ont pas encore franchie
+            uncrossed_rows = matched_rows[~crossed[matched_rows]]
+            if uncrossed_rows.size:
+                newly_crossed = uncrossed_rows[bboxes[uncrossed_rows, 3] >= detection_line_y]
+                crossed[newly_crossed] = True
+                self._mark_crossed(ids[newly_crossed])
+            
+            # Marquer les véhicules non appariés comme disparus (les appariés ont été remis à zéro)
+            # et supprimer ceux qui ont disparu trop longtemps
+            vehicle_matched = np.zeros(len(ids), dtype=np.bool_)
+            vehicle_matched[matched_rows] = True
+            disappeared += ~vehicle_matched
+            self._compact(disappeared <= max_disappeared)
             
             # Enregistrer les boîtes englobantes non appariées comme nouveaux véhicules
-            for i, bbox in enumerate(bounding_boxes):
-                if i not in used_bboxes:
-                    self.register(bbox, detection_line_y)
+            bbox_matched = np.zeros(len(boxes), dtype=np.bool_)
+            bbox_matched[matched_cols] = True
+            if not bbox_matched.all():
+                self._register_corners(boxes[~bbox_matched], box_areas[~bbox_matched], detection_line_y)
         
         return self.vehicles
     
@@ -142,35 +571,37 @@ class VehicleTracker:
             bbox: Boîte englobante (x, y, w, h) du nouveau véhicule
             detection_line_y: Coordonnée y de la ligne de détection
         """
-        self.vehicles[self.next_vehicle_id] = {
-            'bbox': bbox,
-            'disappeared': 0,
-            'crossed_line': False,
-            'first_seen': {'bbox': bbox, 'crossed_line': False}
-        }
-        
-        # Vérifier si le véhicule a franchi la ligne de détection
-        self._check_line_crossing(self.next_vehicle_id, bbox, detection_line_y)
-        
-        self.next_vehicle_id += 1
+        corners = np.array(bbox, dtype=np.int16).reshape(1, 4)
+        corners[:, 2:] += corners[:, :2]
+        self._register_corners(corners, self._box_areas(corners), detection_line_y)
     
-    def _check_line_crossing(self, vehicle_id, bbox, detection_line_y):
+    def _register_corners(self, corners, areas, detection_line_y):
         """
-        Vérifier si un véhicule a franchi la ligne de détection.
+        Enregistrer en une fois de nouveaux véhicules à partir de leurs boîtes englobantes déjà converties en coins.
         
         Args:
-            vehicle_id: ID du véhicule
-            bbox: Boîte englobante actuelle (x, y, w, h) du véhicule
+            corners: Tableau (M, 4) int16 des boîtes englobantes (x1, y1, x2, y2) des nouveaux véhicules
+            areas: Surfaces (M,) float32 des boîtes englobantes
             detection_line_y: Coordonnée y de la ligne de détection
         """
-        x, y, w, h = bbox
-        vehicle_bottom = y + h
+        count = len(corners)
+        new_ids = np.arange(self.next_vehicle_id, self.next_vehicle_id + count, dtype=np.int64)
+        
+        # Vérifier en une fois quels nouveaux véhicules ont déjà franchi la ligne de détection
+        new_crossed = corners[:, 3] >= detection_line_y
+        self._mark_crossed(new_ids[new_crossed])
         
-        # Si le bas du véhicule franchit la ligne de détection
-        if vehicle_bottom >= detection_line_y and not self.vehicles[vehicle_id]['crossed_line']:
-            self.vehicles[vehicle_id]['crossed_line'] = True
-            self.crossed_vehicles.add(vehicle_id)
+        # Agrandir chaque tableau d'état une seule fois pour toutes les nouvelles lignes
+        self._ids = np.concatenate((self._ids, new_ids))
+        self._bboxes = np.concatenate((self._bboxes, corners))
+        self._disappeared = np.concatenate((self._disappeared, np.zeros(count, dtype=np.int32)))
+        self._crossed = np.concatenate((self._crossed, new_crossed))
+        self._areas = np.concatenate((self._areas, areas.astype(np.float32, copy=False)))
+        self._first_bboxes = np.concatenate((self._first_bboxes, corners))
         
+        self.next_vehicle_id += count
+        self._version += 1
+    
     def get_crossed_count(self):
         """
         Obtenir le nombre de véhicules ayant franchi la ligne de détection.
@@ -178,14 +609,24 @@ class VehicleTracker:
         Retourne:
             Nombre de véhicules ayant franchi la ligne
         """
-        return len(self.crossed_vehicles)
+        return self._crossed_count
+    
+    def get_vehicle_arrays(self):
+        """
+        Obtenir l'état des véhicules suivis sous forme de tableaux NumPy.
+        Les tableaux des IDs et des franchissements sont ceux du suiveur : ils sont valables jusqu'au prochain appel à update().
+        
+        Retourne:
+            Tuple (IDs (N,) int64, boîtes englobantes (N, 4) int32, franchissement de la ligne (N,) bool)
+            dans l'ordre du dictionnaire retourné par update()
+        """
+        return self._ids, self._to_xywh(self._bboxes), self._crossed
     
     def get_active_vehicles(self):
         """
         Obtenir les véhicules actuellement actifs.
         
         Retourne:
-            Dictionnaire des véhicules actifs avec leurs IDs et boîtes englobantes
+            Vue (VehicleView) des véhicules actifs avec leurs IDs et boîtes englobantes
         """
-        return {vehicle_id: vehicle_data for vehicle_id, vehicle_data in self.vehicles.items() 
-                if vehicle_data['disappeared'] == 0}
+        return self.active_view
@@ -0,0 +1,57 @@
+"""
+Tests du pipeline lecture / traitement / écriture du système principal.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("numba")
+pytest.importorskip("scipy")
+pytest.importorskip("orjson")
+
+from main import VehicleSpeedDetectionSystem
+
+
+class _FakeCapture:
+    """
+    Capture vidéo factice renvoyant indéfiniment la même image uniforme.
+    """
+    
+    def __init__(self, height=240, width=320, fps=25.0):
+        self.frame = np.full((height, width, 3), 90, dtype=np.uint8)
+        self.fps = fps
+        self.released = False
+    
+    def isOpened(self):
+        return True
+    
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: self.frame.shape[1],
+            cv2.CAP_PROP_FRAME_HEIGHT: self.frame.shape[0],
+            cv2.CAP_PROP_FPS: self.fps,
+        }.get(prop, 0)
+    
+    def read(self):
+        return True, self.frame.copy()
+    
+    def release(self):
+        self.released = True
+
+
+def test_detector_error_reaches_process_video(tmp_path):
+    system = VehicleSpeedDetectionSystem({
+        'output_dir': str(tmp_path),
+        'display_results': False,
+    })
+    system._open_capture = lambda source: _FakeCapture()
+    
+    def failing_detect(frame, draw=True):
+        raise RuntimeError("échec du détecteur")
+    
+    system.detector.detect_vehicles = failing_detect
+    
+    # L'erreur levée dans le fil de lecture doit remonter au lieu de tronquer la vidéo
+    with pytest.raises(RuntimeError, match="échec du détecteur"):
+        system.process_video("factice.mp4")
@@ -0,0 +1,43 @@
+"""
+Tests de régression du détecteur de véhicules.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from modules.object_detection import VehicleDetector
+
+
+def _static_frame(height=240, width=320):
+    """
+    Créer une image de fond uniforme (scène statique sans véhicule).
+    """
+    return np.full((height, width, 3), 90, dtype=np.uint8)
+
+
+def test_static_start_yields_no_detection_on_first_frame():
+    detector = VehicleDetector(min_area=200)
+    
+    bounding_boxes, _, _ = detector.detect_vehicles(_static_frame(), draw=False)
+    
+    assert bounding_boxes.shape == (0, 4)
+
+
+def test_no_full_frame_box_after_warm_up():
+    detector = VehicleDetector(min_area=200)
+    height, width = 240, 320
+    
+    # Apprendre le fond sur une scène statique
+    for _ in range(5):
+        detector.detect_vehicles(_static_frame(height, width), draw=False)
+    
+    # Un véhicule apparaît : il doit être détecté sans boîte couvrant toute l'image
+    frame = _static_frame(height, width)
+    frame[100:140, 60:120] = 230
+    bounding_boxes, _, _ = detector.detect_vehicles(frame, draw=False)
+    
+    assert len(bounding_boxes) >= 1
+    areas = bounding_boxes[:, 2] * bounding_boxes[:, 3]
+    assert (areas < 0.5 * height * width).all()
@@ -0,0 +1,70 @@
+"""
+Tests de l'appariement du suiveur de véhicules.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("scipy")
+
+from modules.vehicle_tracking import VehicleTracker
+
+
+def _crowded_scene(cells_x=8, cells_y=8):
+    """
+    Construire une scène chargée répétant un motif de conflit : deux véhicules suivis A et B
+    préfèrent la même détection (gagnée par B), A ayant une seconde détection au-dessus du seuil.
+    
+    Retourne:
+        Tuple (boîtes des véhicules suivis, boîtes des détections), en (x, y, w, h)
+    """
+    tracks = []
+    detections = []
+    for i in range(cells_x):
+        for j in range(cells_y):
+            x, y = 100 * i + 20, 60 * j
+            tracks += [(x, y, 40, 40), (x + 20, y, 40, 40)]
+            detections += [(x + 12, y, 40, 40), (x - 14, y, 40, 40)]
+    return np.array(tracks, dtype=np.int32), np.array(detections, dtype=np.int32)
+
+
+def _tracker(greedy_min_pairs):
+    tracker = VehicleTracker(max_disappeared=10, min_overlap_ratio=0.3)
+    tracker.GREEDY_MATCH_MIN_PAIRS = greedy_min_pairs
+    return tracker
+
+
+def test_greedy_matches_hungarian_on_crowded_scene():
+    tracks, detections = _crowded_scene()
+    assert len(tracks) * len(detections) >= VehicleTracker.GREEDY_MATCH_MIN_PAIRS
+    
+    greedy = _tracker(0)
+    hungarian = _tracker(np.iinfo(np.int64).max)
+    for tracker in (greedy, hungarian):
+        tracker.step(tracks, detection_line_y=10000)
+        tracker.step(detections, detection_line_y=10000)
+    
+    # Aucune détection n'est enregistrée comme nouveau véhicule et les appariements sont identiques
+    assert greedy.next_vehicle_id == hungarian.next_vehicle_id == len(tracks)
+    greedy_ids, greedy_bboxes, _ = greedy.get_vehicle_arrays()
+    hungarian_ids, hungarian_bboxes, _ = hungarian.get_vehicle_arrays()
+    np.testing.assert_array_equal(greedy_ids, hungarian_ids)
+    np.testing.assert_array_equal(greedy_bboxes, hungarian_bboxes)
+
+
+def test_vehicle_view_rejects_non_integral_keys_and_copies_values():
+    tracker = _tracker(VehicleTracker.GREEDY_MATCH_MIN_PAIRS)
+    tracker.step(np.array([(10, 10, 40, 40)], dtype=np.int32), detection_line_y=10000)
+    view = tracker.vehicles
+    
+    assert 0 in view and np.int64(0) in view
+    for key in ("0", 0.5, None, (0,)):
+        assert key not in view
+        with pytest.raises(KeyError):
+            view[key]
+    
+    # Modifier une valeur renvoyée ne doit pas altérer le cache de la vue
+    for vehicle in view.values():
+        vehicle['disappeared'] = 99
+    assert all(vehicle['disappeared'] == 0 for _, vehicle in view.items())